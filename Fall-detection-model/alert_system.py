@@ -7,9 +7,12 @@ class AlertSystem:
     """
     Manages alerting based on fall detection results.
     """
-    def __init__(self, log_file="fall_log.json", alarm_sound="alarm.mp3"):
+    def __init__(self, log_file="fall_log.json", alarm_sound="alarm.mp3", publisher=None, camera_id=None):
         self.log_file = log_file
         self.alarm_sound = alarm_sound
+        # Optional EventPublisher forwarding logged events to the backend
+        self.publisher = publisher
+        self.camera_id = camera_id
 
     def get_action(self, confidence: float) -> str:
         """Determines the recommended action based on confidence."""
@@ -70,5 +73,7 @@ class AlertSystem:
         # Always log if any confidence > 0
         if confidence > 0.1:
             self.log_event(json_output)
+            if self.publisher is not None:
+                self.publisher.publish(json_output, camera_id=self.camera_id)
 
         return json_output
\ No newline at end of file
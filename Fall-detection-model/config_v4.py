@@ -26,4 +26,39 @@ CONFIRMATION_TIME_THRESHOLD = 2.5
 INACTIVITY_MOVEMENT_THRESHOLD = 0.02
 
 # How many seconds to wait after a confirmed fall before resetting the state.
-FALL_RESET_TIMEOUT = 5.0
\ No newline at end of file
+FALL_RESET_TIMEOUT = 5.0
+
+# --- Backend Publishing ---
+# Identifier attached to every event and heartbeat sent from this camera.
+CAMERA_ID = "camera-1"
+
+# Resident this camera watches; falls are written to their timeline in backend/timeline.db,
+# under the same id the health assistant uses for their records.
+RESIDENT_ID = "default"
+
+# Base URL of the Node backend (backend/server.js).
+BACKEND_URL = "http://localhost:5000"
+
+# Events that cannot be delivered are spooled here and replayed on reconnect.
+OUTBOX_FILE = "fall_outbox.jsonl"
+
+# Maximum number of events per request, and the longest an event waits (seconds) before being sent.
+PUBLISH_BATCH_SIZE = 50
+PUBLISH_FLUSH_INTERVAL = 1.0
+
+# Largest request body (bytes) the publisher sends. Must stay below the body limit of the
+# backend's /api/fall-events route; each event carries ~5 KB of pose keypoints.
+PUBLISH_MAX_BATCH_BYTES = 256 * 1024
+
+# Batches the backend rejects with a 4xx are set aside here instead of being retried.
+DEAD_LETTER_FILE = "fall_dead_letter.jsonl"
+
+# Events queued in memory before new ones are dropped.
+PUBLISH_QUEUE_SIZE = 1000
+
+# Request timeout and the upper bound of the reconnect back-off (seconds).
+PUBLISH_TIMEOUT = 5.0
+PUBLISH_MAX_RETRY_DELAY = 30.0
+
+# How often (seconds) each camera reports its current status to the backend.
+HEARTBEAT_INTERVAL = 10.0
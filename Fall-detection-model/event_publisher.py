@@ -0,0 +1,272 @@
+# event_publisher.py
+import json
+import os
+import time
+import uuid
+import http.client
+from threading import Thread, Lock
+from queue import Queue, Empty, Full
+from urllib.parse import urlsplit
+
+import config_v4 as config
+
+class EventPublisher:
+    """
+    Ships fall-detection events and camera heartbeats to the Node backend.
+
+    Events are batched on a background thread and POSTed over a single
+    keep-alive HTTP connection. Batches that cannot be delivered are appended
+    to a JSON-lines outbox on disk and replayed, oldest first, before any new
+    batch once the backend is reachable again. Batches the backend rejects
+    (4xx) are moved to a dead-letter file instead of being retried.
+    The same thread also appends fall-state transitions to the resident's
+    shared timeline (see backend/timeline_store.py) when one is given.
+    `publish()`, `heartbeat()` and `record_timeline()` never block the caller.
+
+    Args:
+        backend_url (str): Base URL of the backend, e.g. "http://localhost:5000".
+        outbox_file (str): Path of the on-disk outbox used while the backend is down.
+        batch_size (int): Maximum number of events per POST.
+        max_batch_bytes (int): Maximum JSON body size per POST; keep below the backend's body limit.
+        timeline (TimelineStore): Optional shared timeline that record_timeline() entries are written to.
+        resident_id (str): Resident whose timeline the entries belong to.
+        flush_interval (float): Maximum seconds an event waits before its batch is sent.
+    """
+    def __init__(self, backend_url=config.BACKEND_URL, outbox_file=config.OUTBOX_FILE,
+                 batch_size=config.PUBLISH_BATCH_SIZE, flush_interval=config.PUBLISH_FLUSH_INTERVAL,
+                 max_queue_size=config.PUBLISH_QUEUE_SIZE, timeout=config.PUBLISH_TIMEOUT,
+                 max_batch_bytes=config.PUBLISH_MAX_BATCH_BYTES, dead_letter_file=config.DEAD_LETTER_FILE,
+                 timeline=None, resident_id=config.RESIDENT_ID):
+        url = urlsplit(backend_url)
+        self.scheme = url.scheme or "http"
+        self.host = url.hostname or "localhost"
+        self.port = url.port
+        self.path = (url.path.rstrip("/") or "") + "/api/fall-events"
+        self.outbox_file = outbox_file
+        self.dead_letter_file = dead_letter_file
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.timeline = timeline
+        self.resident_id = resident_id
+
+        self.event_queue = Queue(maxsize=max_queue_size)
+        self.is_running = False
+        self.connection = None
+        self.retry_delay = 0.0
+        self.next_attempt = 0.0
+        # seq restarts with every process, so (run_id, seq) is what identifies an event to the backend
+        self.run_id = uuid.uuid4().hex[:12]
+        self._seq = 0
+        self._seq_lock = Lock()
+        self.publisher_thread = Thread(target=self._publish_loop, daemon=True)
+
+    # --- Producer side (called from the detection loop) ---
+
+    def publish(self, event: dict, camera_id=config.CAMERA_ID) -> bool:
+        """Queues a detection event. Returns False if the queue is full and the event was dropped."""
+        return self._enqueue("fall_event", camera_id, event)
+
+    def heartbeat(self, camera_id=config.CAMERA_ID, status="NORMAL") -> bool:
+        """Queues a camera status heartbeat. Heartbeats are never written to the outbox."""
+        return self._enqueue("heartbeat", camera_id, {"status": status})
+
+    def record_timeline(self, kind, camera_id=config.CAMERA_ID) -> bool:
+        """Queues a timeline entry (e.g. a fall-state transition). Written locally, never sent to the backend."""
+        return self._enqueue("timeline", camera_id, {"kind": kind})
+
+    def _enqueue(self, kind, camera_id, payload) -> bool:
+        with self._seq_lock:
+            self._seq += 1
+            seq = self._seq
+        message = {
+            "type": kind,
+            "camera_id": camera_id,
+            "run_id": self.run_id,
+            "seq": seq,
+            "sent_at": time.time(),
+            "payload": payload
+        }
+        try:
+            self.event_queue.put_nowait(message)
+            return True
+        except Full:
+            print(f"[WARNING] Publisher queue full. Dropping {kind} from camera {camera_id}.")
+            return False
+
+    # --- Consumer side (publisher thread) ---
+
+    def _publish_loop(self):
+        while self.is_running or not self.event_queue.empty():
+            batch = self._write_timeline(self._collect_batch())
+            if not self._drain_outbox():
+                self._spool(batch)
+                continue
+            self._spool(self._deliver(batch))
+        self._close_connection()
+
+    def _collect_batch(self) -> list:
+        """Blocks for the first event, then gathers more until the batch is full or the interval expires."""
+        batch = []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.event_queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _write_timeline(self, batch: list) -> list:
+        """Appends queued timeline entries to the shared timeline. Returns the messages meant for the backend."""
+        remaining = []
+        for message in batch:
+            if message["type"] != "timeline":
+                remaining.append(message)
+                continue
+            if self.timeline is None:
+                continue
+            try:
+                self.timeline.append(self.resident_id, message["payload"]["kind"],
+                                     data={"camera_id": message["camera_id"]}, ts=message["sent_at"])
+            except Exception as e:
+                print(f"[ERROR] Could not write to timeline: {e}")
+        return remaining
+
+    def _drain_outbox(self) -> bool:
+        """Replays spooled batches in order. Returns True once the outbox is empty."""
+        if not os.path.exists(self.outbox_file):
+            return True
+        if time.time() < self.next_attempt:
+            return False
+        try:
+            with open(self.outbox_file, "r") as f:
+                spooled = [json.loads(line) for line in f if line.strip()]
+        except Exception as e:
+            print(f"[ERROR] Could not read outbox file: {e}")
+            return False
+
+        remaining = self._deliver(spooled)
+        if remaining:
+            self._rewrite_outbox(remaining)
+            return False
+        print(f"[INFO] Replayed {len(spooled)} spooled event(s) to backend.")
+        os.remove(self.outbox_file)
+        return True
+
+    def _deliver(self, messages: list) -> list:
+        """Sends messages in batches capped by count and body size. Returns the messages not yet delivered."""
+        batch, batch_bytes = [], 0
+        for index, message in enumerate(messages):
+            size = len(json.dumps(message)) + 1
+            if batch and (len(batch) >= self.batch_size or batch_bytes + size > self.max_batch_bytes):
+                undelivered = self._send(batch)
+                if undelivered:
+                    return undelivered + messages[index:]
+                batch, batch_bytes = [], 0
+            batch.append(message)
+            batch_bytes += size
+        return self._send(batch) if batch else []
+
+    def _spool(self, batch: list):
+        """Appends undelivered events to the outbox. Stale heartbeats are discarded."""
+        events = [message for message in batch if message["type"] != "heartbeat"]
+        if not events:
+            return
+        try:
+            with open(self.outbox_file, "a") as f:
+                for message in events:
+                    f.write(json.dumps(message) + "\n")
+        except Exception as e:
+            print(f"[ERROR] Could not write to outbox file: {e}")
+
+    def _dead_letter(self, batch: list, reason: str):
+        """Sets aside a batch the backend rejected, so it does not block the events behind it."""
+        print(f"[ERROR] Backend rejected {len(batch)} event(s) ({reason}). Moving them to {self.dead_letter_file}.")
+        try:
+            with open(self.dead_letter_file, "a") as f:
+                for message in batch:
+                    f.write(json.dumps(message) + "\n")
+        except Exception as e:
+            print(f"[ERROR] Could not write to dead-letter file: {e}")
+
+    def _rewrite_outbox(self, remaining: list):
+        try:
+            with open(self.outbox_file, "w") as f:
+                for message in remaining:
+                    f.write(json.dumps(message) + "\n")
+        except Exception as e:
+            print(f"[ERROR] Could not rewrite outbox file: {e}")
+
+    def _send(self, batch: list) -> list:
+        """
+        POSTs one batch over the persistent connection. Returns the messages that still need
+        sending (empty once the batch is delivered or dead-lettered after a 4xx). Backs off
+        exponentially on other failures.
+        """
+        if time.time() < self.next_attempt:
+            return batch
+        body = json.dumps({"events": batch})
+        try:
+            reused = self.connection is not None
+            try:
+                status = self._post(body)
+            except (http.client.HTTPException, OSError):
+                if not reused:
+                    raise
+                # The server drops idle keep-alive connections; the first request after a quiet
+                # spell fails on the stale socket, so reconnect and retry once.
+                self._close_connection()
+                status = self._post(body)
+            if status == 413 and len(batch) > 1:
+                # Only the half that did not get through is handed back, so nothing is sent twice
+                middle = len(batch) // 2
+                undelivered = self._send(batch[:middle])
+                if undelivered:
+                    return undelivered + batch[middle:]
+                return self._send(batch[middle:])
+            if 400 <= status < 500:
+                self._dead_letter(batch, f"HTTP {status}")
+                return []
+            if status >= 300:
+                raise http.client.HTTPException(f"HTTP {status}")
+        except Exception as e:
+            if self.retry_delay == 0.0:
+                print(f"[WARNING] Backend unreachable ({e}). Spooling events to {self.outbox_file}.")
+            self._close_connection()
+            self.retry_delay = min(max(self.retry_delay * 2, 1.0), config.PUBLISH_MAX_RETRY_DELAY)
+            self.next_attempt = time.time() + self.retry_delay
+            return batch
+
+        if self.retry_delay > 0.0:
+            print("[INFO] Backend connection restored.")
+        self.retry_delay = 0.0
+        self.next_attempt = 0.0
+        return []
+
+    def _post(self, body: str) -> int:
+        if self.connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self.connection = connection_class(self.host, self.port, timeout=self.timeout)
+        self.connection.request("POST", self.path, body=body,
+                                headers={"Content-Type": "application/json", "Connection": "keep-alive"})
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+    def _close_connection(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def start(self):
+        self.is_running = True
+        self.publisher_thread.start()
+
+    def stop(self):
+        """Flushes queued events (to the backend or the outbox) and stops the publisher thread."""
+        self.is_running = False
+        self.publisher_thread.join()
@@ -1,6 +1,8 @@
 # main_v4.py
 import cv2
 import json
+import os
+import sys
 import time
 from threading import Thread
 from queue import Queue
@@ -11,6 +13,11 @@ from camera_feed import CameraFeed
 from pose_estimation import PoseEstimator
 from fall_detection_v4 import FallDetectorV4, FallState
 from alert_system import AlertSystem
+from event_publisher import EventPublisher
+
+# The timeline is shared with the health assistant, which lives in ../backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from timeline_store import TimelineStore, FALL_CONFIRMED, POTENTIAL_FALL
 
 def draw_debug_info(frame, debug_info, status):
     """Draws all the debug information on the frame."""
@@ -48,13 +55,17 @@ def draw_debug_info(frame, debug_info, status):
 
 # The FrameProcessor class is identical to V3, but must instantiate FallDetectorV4
 class FrameProcessor:
-    def __init__(self):
+    def __init__(self, publisher=None, camera_id=config.CAMERA_ID):
         self.frame_queue = Queue(maxsize=1)
         self.result_queue = Queue(maxsize=1)
         self.is_running = False
+        self.camera_id = camera_id
+        self.publisher = publisher
+        self.last_heartbeat = 0.0
+        self.last_status = FallState.NORMAL.name
         self.pose_estimator = PoseEstimator(model_complexity=config.POSE_MODEL_COMPLEXITY)
         self.fall_detector = FallDetectorV4() # <-- Using V4 detector
-        self.alert_system = AlertSystem()
+        self.alert_system = AlertSystem(publisher=publisher, camera_id=camera_id)
         self.processing_thread = Thread(target=self._processing_loop, daemon=True)
 
     def _processing_loop(self):
@@ -80,10 +91,27 @@ class FrameProcessor:
                         {"confidence": confidence, "fall_detected": True}, keypoints, bbox
                     )
             
+            if self.publisher is not None and status != self.last_status:
+                self._record_transition(status)
+            self.last_status = status
+
+            if self.publisher is not None and time.time() - self.last_heartbeat >= config.HEARTBEAT_INTERVAL:
+                self.publisher.heartbeat(self.camera_id, status)
+                self.last_heartbeat = time.time()
+
             draw_debug_info(annotated_frame, debug_info, status)
             if not self.result_queue.full():
                 self.result_queue.put((annotated_frame, json_output, status))
 
+    def _record_transition(self, status):
+        """Queues entry into POTENTIAL_FALL or FALL_CONFIRMED for the resident's timeline.
+
+        The SQLite write happens on the publisher thread, so the detection loop never waits on the shared file.
+        """
+        kinds = {FallState.POTENTIAL_FALL.name: POTENTIAL_FALL, FallState.FALL_CONFIRMED.name: FALL_CONFIRMED}
+        if status in kinds:
+            self.publisher.record_timeline(kinds[status], self.camera_id)
+
     def start(self):
         self.is_running = True
         self.processing_thread.start()
@@ -97,7 +125,12 @@ def main():
     camera = CameraFeed(source=config.CAMERA_SOURCE)
     if not camera.start(): return
 
-    processor = FrameProcessor()
+    # A single publisher can be shared by the FrameProcessors of several cameras;
+    # it also writes their fall-state transitions to the resident's timeline
+    timeline = TimelineStore()
+    publisher = EventPublisher(timeline=timeline, resident_id=config.RESIDENT_ID)
+    publisher.start()
+    processor = FrameProcessor(publisher=publisher, camera_id=config.CAMERA_ID)
     processor.start()
     last_frame_time = time.time()
     annotated_frame, current_status = None, FallState.NORMAL.name
@@ -129,6 +162,8 @@ def main():
         if cv2.waitKey(1) & 0xFF == ord('q'): break
 
     processor.stop()
+    publisher.stop()
+    timeline.close()
     camera.stop()
     cv2.destroyAllWindows()
 
@@ -1,35 +1,397 @@
-import speech_recognition as sr
-import pyttsx3
+from __future__ import annotations
+
 import threading
 import time
 import re
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time as dt_time
 import logging
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import queue
+import os
+import asyncio
+import base64
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import math
+import sqlite3
+import heapq
+import functools
+import hashlib
+import hmac
+import tempfile
+import wave
+from array import array
+from collections import deque
+
+from timeline_store import TimelineStore, FALL_CONFIRMED, POTENTIAL_FALL, MEDICATION_DUE, MEDICATION_TAKEN
+
+# Audio libraries are optional so the assistant can also run headless (text sessions, replay harness)
+try:
+    import speech_recognition as sr
+except ImportError:
+    sr = None
+
+try:
+    import pyttsx3
+except ImportError:
+    pyttsx3 = None
+
+try:
+    from vosk import Model as VoskModel, KaldiRecognizer
+except ImportError:
+    VoskModel = None
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(_name_)
+logger = logging.getLogger(__name__)
+
+# Offline speech model used by VoskRecognizerBackend when available
+VOSK_MODEL_PATH = os.environ.get("VOSK_MODEL_PATH", "models/vosk-model-small-en-us-0.15")
+
+# Rendered speech for fixed phrases, reused across runs
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache"))
+
+# SQLite file holding every user's health records
+HEALTH_DB_PATH = os.environ.get("HEALTH_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "health_records.db"))
+
+# Secret the Node backend signs login tokens with (server.js generateToken); server mode requires it
+JWT_SECRET = os.environ.get("JWT_SECRET")
+
+# Symptom vocabulary (names, synonyms and advice) for SymptomIndex
+SYMPTOMS_PATH = os.environ.get("SYMPTOMS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "symptoms.json"))
 
-@dataclass
+# Inflections and derivations accepted after an intent keyword ("sleepy", "painful", "nutritional")
+SHORT_WORD_SUFFIX = r"(?:s|es|ed|ing)?"
+STEM_SUFFIX = r"(?:s|es|d|ed|ing|y|ful|al|less|ness)?(?:ly|s)?"
+
+# A negation applying directly to an emergency keyword ("nothing serious", "not an emergency",
+# "isn't really urgent"); a negation elsewhere in the sentence ("he's not breathing, emergency") does not count
+NEGATED_CONTEXT = re.compile(r"\b(?:not|no|nothing|never|isn't|isnt|wasn't|wasnt|aren't|arent)\s+"
+                             r"(?:(?:a|an|that|too|very|really|so|particularly)\s+){0,2}$")
+
+# A fall report set in the past ("i fell last night") is a history question, not a call for help
+PAST_TIME = r"(?!.*\b(?:last|yesterday|ago|earlier|before|this (?:week|month|year))\b)"
+
+@dataclass(slots=True)
 class HealthRecord:
     """Simple health record structure"""
     date: str
     type: str
     value: str
     notes: str = ""
+    user_id: str = "default"
+
+class SQLiteHealthStore:
+    """Persistent health record storage in SQLite with batched writes"""
+    
+    def __init__(self, path: str = HEALTH_DB_PATH, batch_size: int = 50, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.last_flush = time.time()
+        self.flush_timer = None
+        self.lock = threading.Lock()
+        
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS health_records (
+                id INTEGER PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                date TEXT NOT NULL,
+                value TEXT NOT NULL,
+                notes TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_user_type_date ON health_records (user_id, type, date);
+            CREATE INDEX IF NOT EXISTS idx_records_user_date ON health_records (user_id, date);
+        """)
+        self.conn.commit()
+    
+    def add(self, record: HealthRecord):
+        """Buffer a record; the batch is written once it is full or old enough"""
+        with self.lock:
+            self.pending.append((record.user_id, record.type, record.date, record.value, record.notes))
+            if len(self.pending) >= self.batch_size or time.time() - self.last_flush >= self.flush_interval:
+                self._flush_locked()
+            elif self.flush_timer is None:
+                # Without this a lone record would wait for the next add or read, however late
+                self.flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+    
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        if self.pending:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO health_records (user_id, type, date, value, notes) VALUES (?, ?, ?, ?, ?)",
+                    self.pending
+                )
+            self.pending = []
+        self.last_flush = time.time()
+    
+    def query(self, user_id: str, record_type: Optional[str] = None, start: Optional[str] = None,
+              end: Optional[str] = None, limit: Optional[int] = None) -> List[HealthRecord]:
+        """Records for a user, optionally filtered by type and inclusive date range, oldest first"""
+        where, params = self._filters(user_id, record_type, start, end)
+        sql = f"SELECT date, type, value, notes, user_id FROM health_records WHERE {where} ORDER BY date, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            self._flush_locked()
+            rows = self.conn.execute(sql, params).fetchall()
+        return [HealthRecord(*row) for row in rows]
+    
+    def count(self, user_id: str, record_type: Optional[str] = None, start: Optional[str] = None,
+              end: Optional[str] = None) -> int:
+        where, params = self._filters(user_id, record_type, start, end)
+        with self.lock:
+            self._flush_locked()
+            return self.conn.execute(f"SELECT COUNT(*) FROM health_records WHERE {where}", params).fetchone()[0]
+    
+    @staticmethod
+    def _filters(user_id, record_type, start, end):
+        clauses, params = ["user_id = ?"], [user_id]
+        if record_type is not None:
+            clauses.append("type = ?")
+            params.append(record_type)
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("date <= ?")
+            params.append(end)
+        return " AND ".join(clauses), params
+    
+    def close(self):
+        with self.lock:
+            self._flush_locked()
+            self.conn.close()
+
+# Everyday words that are never fuzzy-corrected into a symptom ("never" is not "fever", "crash" is not "rash")
+COMMON_WORDS = frozenset("""
+    about above after again against almost alone along already although always among amount another answer
+    anyone anything anyway appear around arrive asked aside asleep avoid awake aware awful badly basic beach
+    bedroom before began begin behind being believe below better between birthday black blank blame blind blood
+    board boring bottle brain bread break breakfast bright bring broken brother brown build bunch calling
+    camera cancel carry catch cause chair chance change charge cheap check child children choice choose church
+    class clean clear clock close clothes coffee color comes coming common connect connection couch could count
+    couple course cousin cover crash crazy cream crowd daily dance daughter death decide dinner doctor doing
+    dollar doubt dream dress drink drive early earth eight either email empty ended enjoy enough entire evening
+    event every exactly except extra family father fault favorite fetch field fifty fight final first flight
+    float floor flower follow forget forward found frame fresh friday friend front fruit funny garden given
+    glass gonna great green group guess guest happen happy heard heart heavy hello helped hence herself hidden
+    himself history holiday honest horse hotel house hundred husband inside issue itself keeping kitchen known
+    large later laugh learn least leave letter level lived lives local lonely longer looking lovely lunch major
+    maybe meant meeting middle might minute missed money month morning mother mouth moved movie music myself
+    never night noise nothing notice number office often order other others outside owner paper parent party
+    people phone piece place plant plate please point power press pretty price print quick quiet quite radio
+    raise rather reach ready really reason remind repeat reply right river rough round saturday school second
+    seems sense seven shall share sheet shirt shoes should shower simple since sister sitting small smile
+    smoke sound south speak spend sport stand start state still stone store story straight street strong stuff
+    sugar summer sunday supper sweet table taking talking taste teacher thank thanks their there these thing
+    things think third those though three through thursday today together tomorrow tonight total touch towards
+    trash travel tried truck truly trust truth trying tuesday twelve twenty under until using usual video visit
+    voice waiting walking wanna watch water weather wednesday weekend weird welcome whatever wheel where which
+    while white whole whose window winter woman women world worry would write wrong yeah years yellow yesterday
+    young yourself
+""".split())
+
+# "no fever", "without a cough" and "I don't have a headache" deny a symptom for the next few words of the clause
+NEGATION_CUES = frozenset("no not without never nor dont didnt doesnt havent hasnt hadnt isnt wasnt arent".split())
+NEGATION_SCOPE = 4
+# ...unless the clause turns first: "no fever but a cough", "no headache, just a cough", "haven't slept and feel dizzy"
+NEGATION_BREAKS = frozenset("and but just only except though although however yet still".split())
+
+@dataclass(slots=True)
+class SymptomMatch:
+    """A symptom found in an utterance"""
+    symptom: str
+    score: float
+    phrase: str
+    position: int
+
+class SymptomIndex:
+    """Synonym, stem and typo tolerant symptom lookup built once from a vocabulary file"""
+    
+    def __init__(self, vocabulary: Dict[str, Dict], min_fuzzy_length: int = 5, min_score: float = 0.8,
+                 common_words: frozenset = COMMON_WORDS):
+        self.advice = {}
+        self.phrases = {}
+        self.max_phrase_length = 1
+        self.min_fuzzy_length = min_fuzzy_length
+        self.min_score = min_score
+        self.tokens = set()
+        self.trigrams = {}
+        
+        for symptom, entry in vocabulary.items():
+            self.advice[symptom] = entry["advice"]
+            for phrase in [symptom] + entry.get("synonyms", []):
+                stems = tuple(self.stem(token) for token in self.tokenize(phrase))
+                if stems:
+                    self.phrases.setdefault(stems, symptom)
+                    self.max_phrase_length = max(self.max_phrase_length, len(stems))
+                    self.tokens.update(stems)
+        
+        # Words that are part of a symptom phrase ("short of breath") still match exactly
+        self.common_words = (set(common_words) | {self.stem(word) for word in common_words}) - self.tokens
+        
+        # Character trigram postings give fuzzy candidates without comparing against every token
+        for token in self.tokens:
+            for gram in self.char_trigrams(token):
+                self.trigrams.setdefault(gram, set()).add(token)
+        self.corrections = {}
+    
+    @classmethod
+    def load(cls, path: str = SYMPTOMS_PATH) -> 'SymptomIndex':
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+    
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+    
+    @staticmethod
+    def stem(token: str) -> str:
+        """Light suffix stripping so "aches", "ached" and "ache" share a key"""
+        for suffix in ("ness", "ing", "ed", "es", "s"):
+            if token.endswith(suffix) and not token.endswith("ss") and len(token) - len(suffix) >= 3:
+                token = token[:-len(suffix)]
+                break
+        if token.endswith("e") and len(token) > 3:
+            token = token[:-1]
+        if token.endswith("y") and len(token) > 3:
+            token = token[:-1] + "i"
+        return token
+    
+    @staticmethod
+    def char_trigrams(token: str) -> set:
+        padded = f"#{token}#"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    @staticmethod
+    def edit_distance(a: str, b: str, limit: int) -> int:
+        """Levenshtein distance, giving up (returning limit + 1) once it must exceed limit"""
+        if abs(len(a) - len(b)) > limit:
+            return limit + 1
+        previous = list(range(len(b) + 1))
+        for i, char_a in enumerate(a, 1):
+            current = [i]
+            for j, char_b in enumerate(b, 1):
+                current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+            if min(current) > limit:
+                return limit + 1
+            previous = current
+        return previous[-1]
+    
+    def correct(self, stem: str) -> Tuple[Optional[str], int]:
+        """Map an utterance stem onto the vocabulary, returning (token, edits)"""
+        if stem in self.tokens:
+            return stem, 0
+        # Recognizers emit real words, so a correctly heard everyday word is not a misheard symptom
+        if len(stem) < self.min_fuzzy_length or stem in self.common_words:
+            return None, 0
+        if stem in self.corrections:
+            return self.corrections[stem]
+        
+        limit = 1 if len(stem) < 8 else 2
+        counts = {}
+        for gram in self.char_trigrams(stem):
+            for token in self.trigrams.get(gram, ()):
+                counts[token] = counts.get(token, 0) + 1
+        
+        best = (None, 0)
+        for token in sorted(counts, key=counts.get, reverse=True)[:10]:
+            # Slips rarely change the first letter; "float" -> "bloat" is a different word, not a typo
+            if token[0] != stem[0]:
+                continue
+            distance = self.edit_distance(stem, token, limit)
+            if distance <= limit and (best[0] is None or distance < best[1]):
+                best = (token, distance)
+        # Noisy ASR can produce endless unseen words; keep the memo bounded
+        if len(self.corrections) > 10000:
+            self.corrections.clear()
+        self.corrections[stem] = best
+        return best
+    
+    def negated(self, text: str) -> set:
+        """Word positions that fall inside a negation's scope"""
+        positions = set()
+        offset = 0
+        for clause in re.split(r"[,.;:!?]", text):
+            words = self.tokenize(clause)
+            scope = 0
+            for i, word in enumerate(words):
+                if word in NEGATION_BREAKS:
+                    scope = 0
+                elif scope:
+                    positions.add(offset + i)
+                    scope -= 1
+                if word in NEGATION_CUES:
+                    scope = NEGATION_SCOPE
+            offset += len(words)
+        return positions
+    
+    def match(self, text: str) -> List[SymptomMatch]:
+        """Find every symptom in one left-to-right pass, longest phrase first, best score first;
+        denied symptoms ("no fever") are skipped"""
+        words = self.tokenize(text)
+        negated = self.negated(text)
+        corrected = [(None, 0) if word in self.common_words else self.correct(self.stem(word)) for word in words]
+        
+        found = {}
+        i = 0
+        while i < len(words):
+            for length in range(min(self.max_phrase_length, len(words) - i), 0, -1):
+                window = corrected[i:i + length]
+                if any(token is None for token, _ in window):
+                    continue
+                symptom = self.phrases.get(tuple(token for token, _ in window))
+                if symptom is None:
+                    continue
+                edits = sum(distance for _, distance in window)
+                score = max(0.0, 1.0 - 0.2 * edits)
+                if score < self.min_score:
+                    continue
+                if i not in negated and (symptom not in found or score > found[symptom].score):
+                    found[symptom] = SymptomMatch(symptom, score, " ".join(words[i:i + length]), i)
+                i += length - 1
+                break
+            i += 1
+        
+        return sorted(found.values(), key=lambda m: (-m.score, m.position))
+
+@functools.lru_cache(maxsize=None)
+def get_symptom_index(path: str = SYMPTOMS_PATH) -> SymptomIndex:
+    """Shared index, built once per vocabulary file"""
+    return SymptomIndex.load(path)
 
 class HealthDatabase:
-    """Simple in-memory health data storage"""
+    """Per-user view of persistent health data, plus static wellness content"""
     
-    def _init_(self):
-        self.records = []
-        self.medications = []
-        self.appointments = []
-        self.symptoms = {}
+    def __init__(self, user_id: str = "default", store: Optional[SQLiteHealthStore] = None,
+                 timeline: Optional[TimelineStore] = None):
+        self.user_id = user_id
+        self.store = store or SQLiteHealthStore()
+        # Shared with the fall detector so both can be queried as one history
+        self.timeline = timeline or TimelineStore()
         
         # Sample health tips
         self.health_tips = {
@@ -56,26 +418,520 @@ class HealthDatabase:
             ]
         }
         
-        # Common symptoms and basic advice
-        self.symptom_advice = {
-            "headache": "Stay hydrated, rest in a quiet dark room, and consider gentle neck stretches. If severe or persistent, consult a doctor.",
-            "fever": "Rest, drink plenty of fluids, and monitor your temperature. Contact a healthcare provider if fever exceeds 103°F or persists.",
-            "cough": "Stay hydrated, use a humidifier, and try warm honey tea. See a doctor if cough persists over 2 weeks.",
-            "sore throat": "Gargle with warm salt water, drink warm liquids, and rest your voice. Consult a doctor if severe or lasts over 3 days.",
-            "stomach ache": "Try bland foods, stay hydrated, and rest. Avoid dairy and spicy foods. See a doctor if severe or persistent.",
-            "back pain": "Apply ice or heat, gentle stretches, and maintain good posture. Consult a healthcare provider if pain is severe."
-        }
+        # Common symptoms and basic advice, loaded from the symptom vocabulary
+        self.symptom_index = get_symptom_index()
+        self.symptom_advice = self.symptom_index.advice
+    
+    def add_record(self, record_type: str, value: str, notes: str = "", date: Optional[str] = None) -> HealthRecord:
+        """Store a record for this user, dated today unless a date is given"""
+        record = HealthRecord(
+            date=date or datetime.now().strftime("%Y-%m-%d"),
+            type=record_type,
+            value=value,
+            notes=notes,
+            user_id=self.user_id
+        )
+        self.store.add(record)
+        # A backdated record ("2024-05-01" or a full ISO timestamp) goes on that day of the timeline, not today
+        ts = datetime.fromisoformat(date).timestamp() if date else None
+        self.timeline.append(self.user_id, record_type, value, {"notes": notes} if notes else None, ts=ts)
+        return record
+    
+    def query(self, record_type: Optional[str] = None, start: Optional[str] = None,
+              end: Optional[str] = None, limit: Optional[int] = None) -> List[HealthRecord]:
+        """Range query over this user's records by type and date"""
+        return self.store.query(self.user_id, record_type, start, end, limit)
+    
+    @property
+    def records(self) -> List[HealthRecord]:
+        return self.query()
+    
+    @property
+    def medications(self) -> List[HealthRecord]:
+        return self.query("medication")
+    
+    @property
+    def appointments(self) -> List[HealthRecord]:
+        return self.query("appointment")
+    
+    @property
+    def symptoms(self) -> List[HealthRecord]:
+        return self.query("symptom")
+    
+    def close(self):
+        self.store.close()
+        self.timeline.close()
+
+@dataclass(slots=True)
+class ReminderSchedule:
+    """Daily dosing schedule for one medication"""
+    id: int
+    user_id: str
+    medication: str
+    times: List[str]
+    next_due: float = 0.0
+    active: bool = True
+    
+    def next_occurrence(self, after: float) -> float:
+        """Epoch time of the first dose strictly after `after`"""
+        start = datetime.fromtimestamp(after)
+        candidates = []
+        for days in (0, 1):
+            day = start.date() + timedelta(days=days)
+            for time_of_day in self.times:
+                hour, minute = map(int, time_of_day.split(":"))
+                candidates.append(datetime.combine(day, dt_time(hour, minute)).timestamp())
+        return min(candidate for candidate in candidates if candidate > after)
+
+class ReminderScheduler:
+    """Fires medication reminders from one timer thread that sleeps until the earliest due time"""
+    
+    def __init__(self, store: SQLiteHealthStore, notifier: Optional[Callable[[str, str], None]] = None,
+                 missed_grace: float = 3600.0, timeline: Optional[TimelineStore] = None):
+        self.store = store
+        # Fired reminders are logged as due doses, the denominator of medication adherence
+        self.timeline = timeline
+        # Called as notifier(user_id, message) for every reminder that fires
+        self.notifier = notifier or (lambda user_id, message: logger.info(f"Reminder for {user_id}: {message}"))
+        # Reminders missed by more than this (e.g. while the process was down) are skipped
+        self.missed_grace = missed_grace
+        
+        self.schedules = {}
+        self.heap = []
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        
+        with self.store.lock, self.store.conn:
+            self.store.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS reminders (
+                    id INTEGER PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    medication TEXT NOT NULL,
+                    times TEXT NOT NULL,
+                    next_due REAL NOT NULL,
+                    active INTEGER NOT NULL DEFAULT 1
+                );
+                CREATE INDEX IF NOT EXISTS idx_reminders_user ON reminders (user_id);
+            """)
+        self._load()
+    
+    def _load(self):
+        """Rebuild the heap from persisted schedules after a restart"""
+        with self.store.lock:
+            rows = self.store.conn.execute(
+                "SELECT id, user_id, medication, times, next_due FROM reminders WHERE active = 1"
+            ).fetchall()
+        
+        now = time.time()
+        for schedule_id, user_id, medication, times, next_due in rows:
+            schedule = ReminderSchedule(schedule_id, user_id, medication, times.split(","), next_due)
+            if schedule.next_due < now - self.missed_grace:
+                schedule.next_due = schedule.next_occurrence(now)
+            self.schedules[schedule_id] = schedule
+            self.heap.append((schedule.next_due, schedule_id))
+        heapq.heapify(self.heap)
+    
+    def add(self, user_id: str, medication: str, times: List[str]) -> ReminderSchedule:
+        """Create a daily schedule; times are "HH:MM" in local time"""
+        schedule = ReminderSchedule(0, user_id, medication, sorted(set(times)))
+        schedule.next_due = schedule.next_occurrence(time.time())
+        with self.store.lock, self.store.conn:
+            cursor = self.store.conn.execute(
+                "INSERT INTO reminders (user_id, medication, times, next_due) VALUES (?, ?, ?, ?)",
+                (user_id, medication, ",".join(schedule.times), schedule.next_due)
+            )
+        schedule.id = cursor.lastrowid
+        
+        with self.condition:
+            self.schedules[schedule.id] = schedule
+            heapq.heappush(self.heap, (schedule.next_due, schedule.id))
+            # Wake the timer in case this is now the earliest reminder
+            self.condition.notify()
+        return schedule
+    
+    def cancel(self, schedule_id: int):
+        """Deactivate a schedule; its heap entry is discarded lazily when it comes due"""
+        with self.condition:
+            schedule = self.schedules.pop(schedule_id, None)
+        if schedule is not None:
+            with self.store.lock, self.store.conn:
+                self.store.conn.execute("UPDATE reminders SET active = 0 WHERE id = ?", (schedule_id,))
+    
+    def for_user(self, user_id: str) -> List[ReminderSchedule]:
+        with self.condition:
+            return [schedule for schedule in self.schedules.values() if schedule.user_id == user_id]
+    
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+    
+    def _run(self):
+        while True:
+            with self.condition:
+                fired = self._wait_for_due()
+            if fired is None:
+                return
+            
+            for schedule, on_time in fired:
+                if not on_time:
+                    continue
+                try:
+                    self.notifier(schedule.user_id, f"It's time to take your {schedule.medication}.")
+                    if self.timeline is not None:
+                        self.timeline.append(schedule.user_id, MEDICATION_DUE, schedule.medication)
+                except Exception as e:
+                    logger.error(f"Reminder delivery error: {e}")
+            
+            with self.store.lock, self.store.conn:
+                self.store.conn.executemany(
+                    "UPDATE reminders SET next_due = ? WHERE id = ?",
+                    [(schedule.next_due, schedule.id) for schedule, _ in fired]
+                )
+    
+    def _wait_for_due(self) -> Optional[List[Tuple[ReminderSchedule, bool]]]:
+        """Sleep until reminders are due; pop and reschedule them. Must hold the condition."""
+        while self.running:
+            now = time.time()
+            if not self.heap or self.heap[0][0] > now:
+                self.condition.wait(timeout=self.heap[0][0] - now if self.heap else None)
+                continue
+            
+            fired = []
+            while self.heap and self.heap[0][0] <= now:
+                due, schedule_id = heapq.heappop(self.heap)
+                schedule = self.schedules.get(schedule_id)
+                # Skip cancelled schedules and entries superseded by a later reschedule
+                if schedule is None or schedule.next_due != due:
+                    continue
+                schedule.next_due = schedule.next_occurrence(now)
+                heapq.heappush(self.heap, (schedule.next_due, schedule_id))
+                fired.append((schedule, now - due <= self.missed_grace))
+            if fired:
+                return fired
+        return None
+
+class RecognizerBackend:
+    """Interface for speech-to-text engines used by VoiceEngine"""
+    
+    # Streaming backends receive raw microphone chunks and report partial hypotheses
+    streaming = False
+    
+    def recognize(self, audio: sr.AudioData) -> str:
+        """Transcribe a complete utterance; raise sr.UnknownValueError if nothing was understood"""
+        raise NotImplementedError
+    
+    def start_stream(self, sample_rate: int):
+        """Begin a new utterance"""
+        raise NotImplementedError
+    
+    def accept_chunk(self, chunk: bytes) -> Tuple[bool, str]:
+        """Feed 16-bit mono audio; return (is_final, text) where text is the partial or final hypothesis"""
+        raise NotImplementedError
+    
+    def finish(self) -> str:
+        """End the utterance and return the final transcript"""
+        raise NotImplementedError
 
-class VoiceEngine:
+class GoogleRecognizerBackend(RecognizerBackend):
+    """Online, whole-utterance recognition through the Google Web Speech API"""
+    
+    def __init__(self, recognizer: sr.Recognizer):
+        self.recognizer = recognizer
+    
+    def recognize(self, audio: sr.AudioData) -> str:
+        return self.recognizer.recognize_google(audio)
+
+class VoskRecognizerBackend(RecognizerBackend):
+    """Offline streaming recognition with a local Vosk (Kaldi) model"""
+    
+    streaming = True
+    
+    def __init__(self, model_path: str = VOSK_MODEL_PATH):
+        self.model = VoskModel(model_path)
+        self.stream = None
+    
+    def recognize(self, audio: sr.AudioData) -> str:
+        # A private recognizer keeps whole-utterance calls safe to run from worker threads
+        stream = KaldiRecognizer(self.model, audio.sample_rate)
+        parts = []
+        if stream.AcceptWaveform(audio.get_raw_data(convert_width=2)):
+            parts.append(json.loads(stream.Result()).get("text", ""))
+        parts.append(json.loads(stream.FinalResult()).get("text", ""))
+        text = " ".join(part for part in parts if part)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+    
+    def start_stream(self, sample_rate: int):
+        self.stream = KaldiRecognizer(self.model, sample_rate)
+    
+    def accept_chunk(self, chunk: bytes) -> Tuple[bool, str]:
+        if self.stream.AcceptWaveform(chunk):
+            return True, json.loads(self.stream.Result()).get("text", "")
+        return False, json.loads(self.stream.PartialResult()).get("partial", "")
+    
+    def finish(self) -> str:
+        text = json.loads(self.stream.FinalResult()).get("text", "")
+        self.stream = None
+        return text
+
+def create_recognizer_backend(recognizer: sr.Recognizer) -> RecognizerBackend:
+    """Prefer the offline streaming engine, falling back to Google when Vosk or its model is missing"""
+    if VoskModel is not None and os.path.isdir(VOSK_MODEL_PATH):
+        try:
+            return VoskRecognizerBackend(VOSK_MODEL_PATH)
+        except Exception as e:
+            logger.error(f"Could not load Vosk model: {e}")
+    logger.info("Offline recognizer unavailable, using Google speech recognition")
+    return GoogleRecognizerBackend(recognizer)
+
+class VoiceActivityDetector:
+    """Frame-level energy VAD that tracks a running noise-floor estimate"""
+    
+    def __init__(self, speech_ratio: float = 3.0, min_energy: float = 300.0,
+                 floor_adaptation: float = 0.05, floor_window: int = 50):
+        self.speech_ratio = speech_ratio
+        self.min_energy = min_energy
+        self.floor_adaptation = floor_adaptation
+        self.noise_floor = None
+        # Energies of the last few seconds; their minimum is the background level even mid-speech
+        self.recent_energy = deque(maxlen=floor_window)
+    
+    @staticmethod
+    def frame_energy(frame: bytes) -> float:
+        """RMS energy of a 16-bit mono frame"""
+        samples = array('h', frame[:len(frame) - len(frame) % 2])
+        if not samples:
+            return 0.0
+        return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+    
+    def is_speech(self, frame: bytes, ratio: Optional[float] = None, adapt: bool = True) -> bool:
+        """Classify a frame and fold it into the noise floor"""
+        energy = self.frame_energy(frame)
+        if adapt:
+            self.recent_energy.append(energy)
+        if self.noise_floor is None:
+            self.noise_floor = energy
+            return False
+        
+        speech = energy > max(self.noise_floor * (ratio or self.speech_ratio), self.min_energy)
+        if adapt:
+            if not speech:
+                self.noise_floor += self.floor_adaptation * (energy - self.noise_floor)
+            else:
+                # A lasting rise in background noise (a fan, a TV) never yields a non-speech frame,
+                # so follow the recent minimum upwards slowly or the VAD stays stuck in speech
+                quietest = min(self.recent_energy)
+                if quietest > self.noise_floor:
+                    self.noise_floor += self.floor_adaptation * (quietest - self.noise_floor)
+        return speech
+    
+    def reestimate_floor(self):
+        """Reset the noise floor to the recent minimum, e.g. after an utterance hit its length cap"""
+        if self.recent_energy:
+            self.noise_floor = min(self.recent_energy)
+
+class MicrophoneStream(threading.Thread):
+    """Keeps the microphone open and segments speech into utterances with a VAD"""
+    
+    def __init__(self, microphone: sr.Microphone, backend: RecognizerBackend,
+                 vad: Optional[VoiceActivityDetector] = None, onset: float = 0.1,
+                 hangover: float = 0.5, pre_roll: float = 0.3, max_utterance: float = 8.0,
+                 barge_in_ratio: float = 2.0):
+        super().__init__(daemon=True)
+        self.microphone = microphone
+        self.backend = backend
+        self.vad = vad or VoiceActivityDetector()
+        self.onset = onset
+        self.hangover = hangover
+        self.pre_roll = pre_roll
+        self.max_utterance = max_utterance
+        # While the assistant is talking, speech must be this much louder to count (echo rejection)
+        self.barge_in_ratio = barge_in_ratio
+        
+        # Items are transcripts (streaming backends) or sr.AudioData segments to recognize
+        self.utterance_queue = queue.Queue()
+        # Callbacks receiving (frame, in_speech) for wake-word or barge-in detection
+        self.frame_listeners = []
+        # Called with each partial hypothesis; returning True ends the utterance early
+        self.on_partial = None
+        # Called when an utterance begins, e.g. to interrupt playback
+        self.on_speech_start = None
+        self.speech_started = threading.Event()
+        self.final_parts = []
+        self.speaking = False
+        self.running = False
+    
+    def start(self):
+        self.running = True
+        super().start()
+    
+    def run(self):
+        try:
+            with self.microphone as source:
+                self._segment_loop(source)
+        except Exception as e:
+            logger.error(f"Microphone stream error: {e}")
+        finally:
+            self.running = False
+    
+    def _segment_loop(self, source):
+        frame_seconds = source.CHUNK / source.SAMPLE_RATE
+        onset_frames = max(1, int(self.onset / frame_seconds))
+        hangover_frames = max(1, int(self.hangover / frame_seconds))
+        max_frames = int(self.max_utterance / frame_seconds)
+        pre_roll = deque(maxlen=max(1, int(self.pre_roll / frame_seconds)))
+        
+        frames = []
+        speech_run = 0
+        silence_run = 0
+        committed = False
+        
+        while self.running:
+            frame = source.stream.read(source.CHUNK)
+            if self.speaking:
+                speech = self.vad.is_speech(frame, ratio=self.vad.speech_ratio * self.barge_in_ratio, adapt=False)
+            else:
+                speech = self.vad.is_speech(frame)
+            in_utterance = bool(frames)
+            for listener in self.frame_listeners:
+                listener(frame, speech or in_utterance)
+            
+            if not in_utterance:
+                pre_roll.append(frame)
+                speech_run = speech_run + 1 if speech else 0
+                if speech_run >= onset_frames:
+                    frames = list(pre_roll)
+                    pre_roll.clear()
+                    silence_run = 0
+                    committed = False
+                    self.speech_started.set()
+                    if self.on_speech_start:
+                        self.on_speech_start()
+                    if self.backend.streaming:
+                        self.final_parts = []
+                        self.backend.start_stream(source.SAMPLE_RATE)
+                        committed = self._feed_backend(b"".join(frames))
+                continue
+            
+            frames.append(frame)
+            silence_run = 0 if speech else silence_run + 1
+            if self.backend.streaming and not committed:
+                committed = self._feed_backend(frame)
+            
+            if silence_run >= hangover_frames or len(frames) >= max_frames:
+                self._emit(frames, source, committed)
+                if len(frames) >= max_frames:
+                    # Hitting the cap usually means the floor is stale rather than a very long sentence
+                    self.vad.reestimate_floor()
+                frames = []
+                speech_run = 0
+                self.speech_started.clear()
+    
+    def _feed_backend(self, chunk: bytes) -> bool:
+        """Stream audio into the recognizer; True once a transcript has been queued early"""
+        is_final, text = self.backend.accept_chunk(chunk)
+        if is_final:
+            if text:
+                self.final_parts.append(text)
+            return False
+        if text and self.on_partial and self.on_partial(" ".join(self.final_parts + [text])):
+            self.backend.finish()
+            self.utterance_queue.put(" ".join(self.final_parts + [text]))
+            return True
+        return False
+    
+    def _emit(self, frames: List[bytes], source, committed: bool):
+        if committed:
+            return
+        if self.backend.streaming:
+            self.utterance_queue.put(" ".join(self.final_parts + [self.backend.finish()]).strip())
+        else:
+            self.utterance_queue.put(sr.AudioData(b"".join(frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH))
+    
+    def stop(self):
+        self.running = False
+
+def render_to_temp_file(render: Callable[[str, str], None], text: str) -> str:
+    """Render one-off speech to a temporary WAV the caller deletes after use"""
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        render(text, path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+class PhraseCache:
+    """Pre-rendered TTS audio on disk, keyed by text and voice settings"""
+    
+    def __init__(self, directory: str = TTS_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+    
+    def path_for(self, text: str, voice_settings: Tuple) -> str:
+        key = hashlib.sha1(json.dumps([text, list(voice_settings)]).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.wav")
+    
+    def get(self, text: str, voice_settings: Tuple) -> Optional[str]:
+        path = self.path_for(text, voice_settings)
+        return path if os.path.exists(path) else None
+
+class ConversationChannel:
+    """Input/output interface the assistant's handlers talk through"""
+    
+    # Called with each partial hypothesis; returning True ends the utterance early
+    on_partial = None
+    
+    def speak(self, text: str):
+        raise NotImplementedError
+    
+    def listen_once(self, timeout: int = 5) -> Optional[str]:
+        raise NotImplementedError
+    
+    def prerender(self, phrases: List[str]):
+        """Optional hint listing phrases that will be spoken often"""
+        pass
+
+class VoiceEngine(ConversationChannel):
     """Responsive voice recognition and synthesis"""
     
-    def _init_(self):
+    def __init__(self, recognizer_backend: Optional[RecognizerBackend] = None):
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
-        self.tts_engine = pyttsx3.init()
-        self.setup_voice()
         self.listening = False
         self.command_queue = queue.Queue()
+        self.backend = recognizer_backend or create_recognizer_backend(self.recognizer)
+        # Called with each partial hypothesis; returning True ends the utterance early
+        self.on_partial = None
+        self.mic_stream = None
+        
+        # All synthesis and playback happens on one worker thread that owns the TTS engine;
+        # the engine is created there because SAPI5 (COM) and nsss are bound to their creating thread
+        self.tts_engine = None
+        self.voice_settings = None
+        self.phrase_cache = PhraseCache()
+        # Only these go into the on-disk cache; anything else may be personal and is rendered to a temp file
+        self.static_phrases = set()
+        self.speech_queue = queue.Queue()
+        self.render_queue = queue.Queue()
+        self.speech_generation = 0
+        self.audio_output = None
+        self.speech_thread = threading.Thread(target=self._speech_loop, daemon=True)
+        self.speech_thread.start()
         
         # Optimize recognition settings
         self.recognizer.energy_threshold = 4000
@@ -94,24 +950,149 @@ class VoiceEngine:
         
         self.tts_engine.setProperty('rate', 175)  # Comfortable speaking rate
         self.tts_engine.setProperty('volume', 0.9)
+        
+        # Part of the phrase cache key, so changing the voice invalidates rendered audio
+        self.voice_settings = (
+            self.tts_engine.getProperty('voice'),
+            self.tts_engine.getProperty('rate'),
+            self.tts_engine.getProperty('volume')
+        )
     
-    def speak(self, text: str):
-        """Natural text-to-speech"""
+    def speak(self, text: str, wait: bool = False):
+        """Queue text for speech without blocking the caller"""
+        logger.info(f"Assistant: {text}")
+        self.speech_queue.put((self.speech_generation, text))
+        if wait:
+            self.wait_until_done()
+    
+    def wait_until_done(self):
+        """Block until everything queued so far has been spoken or interrupted"""
+        self.speech_queue.join()
+    
+    def interrupt(self):
+        """Barge-in: stop the current phrase and drop everything still queued"""
+        self.speech_generation += 1
+    
+    def prerender(self, phrases: List[str]):
+        """Render fixed phrases into the cache in the background, behind any pending speech"""
+        for phrase in phrases:
+            self.static_phrases.add(phrase)
+            self.render_queue.put(phrase)
+    
+    def _speech_loop(self):
+        try:
+            self.tts_engine = pyttsx3.init()
+            self.setup_voice()
+        except Exception as e:
+            logger.error(f"Could not start TTS engine: {e}")
+        
+        while True:
+            try:
+                # Only idle-wait when there is nothing left to pre-render
+                generation, text = self.speech_queue.get(block=self.render_queue.empty(), timeout=0.1)
+            except queue.Empty:
+                self._render_pending()
+                continue
+            
+            try:
+                if generation == self.speech_generation:
+                    self._play(text, generation)
+            except Exception as e:
+                logger.error(f"Speech error: {e}")
+            finally:
+                self.speech_queue.task_done()
+    
+    def _render_pending(self):
+        try:
+            phrase = self.render_queue.get_nowait()
+        except queue.Empty:
+            return
+        if self.tts_engine is None:
+            return
         try:
-            logger.info(f"Assistant: {text}")
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
+            if self.phrase_cache.get(phrase, self.voice_settings) is None:
+                self._render(phrase, self.phrase_cache.path_for(phrase, self.voice_settings))
         except Exception as e:
-            logger.error(f"Speech error: {e}")
+            logger.error(f"Could not pre-render phrase: {e}")
+    
+    def _render(self, text: str, path: str):
+        if self.tts_engine is None:
+            raise RuntimeError("TTS engine unavailable")
+        self.tts_engine.save_to_file(text, path)
+        self.tts_engine.runAndWait()
+    
+    def _play(self, text: str, generation: int):
+        path = self.phrase_cache.get(text, self.voice_settings)
+        temporary = path is None and text not in self.static_phrases
+        if temporary:
+            path = render_to_temp_file(self._render, text)
+        elif path is None:
+            path = self.phrase_cache.path_for(text, self.voice_settings)
+            self._render(text, path)
+        try:
+            self._play_file(path, generation)
+        finally:
+            if temporary:
+                os.remove(path)
+    
+    def _play_file(self, path: str, generation: int):
+        if self.audio_output is None:
+            self.audio_output = sr.Microphone.get_pyaudio().PyAudio()
+        
+        # Let the open microphone tell our own voice from a user talking over it
+        if self.mic_stream:
+            self.mic_stream.speaking = True
+        try:
+            with wave.open(path, 'rb') as wav:
+                stream = self.audio_output.open(
+                    format=self.audio_output.get_format_from_width(wav.getsampwidth()),
+                    channels=wav.getnchannels(),
+                    rate=wav.getframerate(),
+                    output=True
+                )
+                try:
+                    data = wav.readframes(1024)
+                    while data and generation == self.speech_generation:
+                        stream.write(data)
+                        data = wav.readframes(1024)
+                finally:
+                    stream.stop_stream()
+                    stream.close()
+        finally:
+            if self.mic_stream:
+                self.mic_stream.speaking = False
+    
+    def start_stream(self):
+        """Open the microphone once and segment utterances with the VAD in the background"""
+        if self.mic_stream and self.mic_stream.is_alive():
+            return
+        self.mic_stream = MicrophoneStream(self.microphone, self.backend)
+        self.mic_stream.on_partial = lambda text: bool(self.on_partial and self.on_partial(text))
+        self.mic_stream.on_speech_start = self.interrupt
+        self.mic_stream.start()
+    
+    def stop_stream(self):
+        if self.mic_stream:
+            self.mic_stream.stop()
+            self.mic_stream.join(timeout=2)
+            self.mic_stream = None
     
     def listen_once(self, timeout: int = 5) -> Optional[str]:
         """Listen for a single command with timeout"""
+        if self.mic_stream and self.mic_stream.running:
+            return self.next_utterance(timeout)
+        
+        # Without the VAD stream we cannot tell our own voice apart, so finish talking first
+        self.wait_until_done()
+        if self.backend.streaming:
+            return self.listen_streaming(timeout=timeout, phrase_time_limit=5)
+        
         try:
             with self.microphone as source:
                 self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
                 audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=5)
             
-            command = self.recognizer.recognize_google(audio).lower()
+            command = self.backend.recognize(audio).lower()
             logger.info(f"User: {command}")
             return command
             
@@ -123,8 +1104,76 @@ class VoiceEngine:
             logger.error(f"Recognition error: {e}")
             return None
     
+    def next_utterance(self, timeout: float) -> Optional[str]:
+        """Take the next VAD-segmented utterance from the open microphone stream"""
+        try:
+            utterance = self.mic_stream.utterance_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        
+        try:
+            if isinstance(utterance, sr.AudioData):
+                utterance = self.backend.recognize(utterance)
+        except sr.UnknownValueError:
+            return "unclear"
+        except sr.RequestError as e:
+            logger.error(f"Recognition error: {e}")
+            return None
+        
+        command = utterance.lower()
+        if not command:
+            return "unclear"
+        logger.info(f"User: {command}")
+        return command
+    
+    def listen_streaming(self, timeout: float = 5, phrase_time_limit: float = 5) -> Optional[str]:
+        """Stream microphone audio into the backend, reporting partial hypotheses as they arrive"""
+        try:
+            with self.microphone as source:
+                self.backend.start_stream(source.SAMPLE_RATE)
+                started = time.time()
+                speech_started = None
+                text = ""
+                
+                while True:
+                    is_final, text = self.backend.accept_chunk(source.stream.read(source.CHUNK))
+                    now = time.time()
+                    
+                    if text and speech_started is None:
+                        speech_started = now
+                    if is_final and text:
+                        break
+                    if text and self.on_partial and self.on_partial(text):
+                        break
+                    if speech_started is None and now - started > timeout:
+                        self.backend.finish()
+                        return None
+                    if speech_started is not None and now - speech_started > phrase_time_limit:
+                        text = ""
+                        break
+                
+                final_text = self.backend.finish()
+                command = (text or final_text).lower()
+            
+            if not command:
+                return "unclear"
+            logger.info(f"User: {command}")
+            return command
+            
+        except Exception as e:
+            logger.error(f"Streaming recognition error: {e}")
+            return None
+    
     def listen_continuous(self):
         """Background voice recognition"""
+        self.wait_until_done()
+        if self.backend.streaming:
+            while self.listening:
+                command = self.listen_streaming(timeout=1, phrase_time_limit=4)
+                if command and command != "unclear":
+                    self.command_queue.put(command)
+            return
+        
         with self.microphone as source:
             self.recognizer.adjust_for_ambient_noise(source)
         
@@ -133,7 +1182,7 @@ class VoiceEngine:
                 with self.microphone as source:
                     audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=4)
                 
-                command = self.recognizer.recognize_google(audio).lower()
+                command = self.backend.recognize(audio).lower()
                 self.command_queue.put(command)
                 
             except (sr.WaitTimeoutError, sr.UnknownValueError):
@@ -142,14 +1191,42 @@ class VoiceEngine:
                 logger.error(f"Continuous listening error: {e}")
                 time.sleep(0.5)
 
+class TextChannel(ConversationChannel):
+    """Channel for one server session; turns run on the event loop and never wait for input"""
+    
+    def __init__(self, send: Callable[[str], None]):
+        # Thread-safe callback that hands spoken text back to the event loop (reminders speak from a timer thread)
+        self.send = send
+    
+    def speak(self, text: str):
+        self.send(text)
+    
+    def listen_once(self, timeout: int = 5) -> Optional[str]:
+        # Follow-up questions go through HealthAssistant.ask; the answer arrives as the next message
+        return None
+
+@dataclass(slots=True)
+class FollowUp:
+    """A question the assistant is waiting on; the next utterance answers it"""
+    on_answer: Callable[[Optional[str]], None]
+    timeout: float
+    deadline: float
+
 class HealthAssistant:
     """Simple, responsive health AI assistant"""
     
-    def _init_(self):
-        self.voice = VoiceEngine()
-        self.health_db = HealthDatabase()
+    def __init__(self, channel: Optional[ConversationChannel] = None,
+               health_db: Optional[HealthDatabase] = None,
+               reminders: Optional[ReminderScheduler] = None):
+        self.voice = channel or VoiceEngine()
+        self.health_db = health_db or HealthDatabase()
+        # Shared by all sessions in server mode; otherwise reminders are spoken on this channel
+        self.reminders = reminders or ReminderScheduler(self.health_db.store, notifier=self.notify_reminder,
+                                                        timeline=self.health_db.timeline)
         self.user_name = "friend"
         self.conversation_active = True
+        # Pending follow-up question, so handlers never block waiting for an answer
+        self.followup = None
         
         # Intent patterns for natural language understanding
         self.intent_patterns = {
@@ -161,34 +1238,155 @@ class HealthAssistant:
             'record': [r'record', r'log', r'track', r'save', r'remember'],
             'exercise': [r'exercise', r'workout', r'fitness', r'activity'],
             'nutrition': [r'food', r'eat', r'diet', r'nutrition', r'meal'],
-            'sleep': [r'sleep', r'tired', r'insomnia', r'rest'],
+            'sleep': [r'sleep', r'asleep', r'tired', r'insomnia', r'rest'],
             'mental_health': [r'stress', r'anxiety', r'depression', r'mood', r'mental health'],
-            'emergency': [r'emergency', r'urgent', r'serious', r'911'],
+            # "fall asleep" is about sleep, not a fall
+            'history': [r'what happened', r'how many falls', r'any falls', r'fall(?!\w*\s+asleep)', r'fell(?!\s+asleep)',
+                        r'fallen(?!\s+asleep)', r'near miss(?:es)?', r'adherence', r'history'],
+            # A fall happening now ("help i fell", "i've fallen", "i can't get up") needs help, not a summary;
+            # questions ("did i fall", "have i fallen") and past falls stay with history
+            'emergency': [r'emergency', r'urgent', r'serious', r'911',
+                          rf"(?<!did )(?<!have )(?<!has )(?:i|he|she|we|they|someone|somebody)(?:'?ve|'s| have| has)? "
+                          rf"(?:just )?(?:fell|fallen)(?!\s+asleep){PAST_TIME}",
+                          rf"(?:had|taken) a (?:bad )?fall{PAST_TIME}",
+                          r"can'?t get up", r'cannot get up', r'help me up', r"(?:i'?m|i am) on the floor"],
             'goodbye': [r'goodbye', r'bye', r'exit', r'quit', r'stop']
         }
-    
-    def classify_intent(self, text: str) -> str:
-        """Simple intent classification using pattern matching"""
-        text = text.lower()
+        # Fixed replies for each handler, also pre-rendered into the speech cache
+        self.responses = {
+            'greeting': [
+                "Hello! I'm your health assistant. How can I help you today?",
+                "Hi there! I'm here to help with your health and wellness questions.",
+                "Good to hear from you! What health topic would you like to discuss?",
+                "Hello! I'm ready to assist you with health information and tips."
+            ],
+            'exercise': [
+                "Regular exercise is great for your health! Start with 30 minutes of walking daily.",
+                "Try some simple stretches or yoga. Even 10 minutes can make a difference.",
+                "Exercise doesn't have to be intense. Dancing, gardening, or playing with pets all count!",
+                "Remember to warm up before exercise and cool down afterward to prevent injury."
+            ],
+            'nutrition': [
+                "A balanced diet includes fruits, vegetables, whole grains, lean proteins, and healthy fats.",
+                "Try to eat a rainbow of colorful fruits and vegetables each day.",
+                "Stay hydrated by drinking water throughout the day.",
+                "Limit processed foods and added sugars when possible.",
+                "Portion control is important - listen to your body's hunger cues."
+            ],
+            'sleep': [
+                "Adults need 7-9 hours of sleep each night for optimal health.",
+                "Try to go to bed and wake up at the same time every day, even on weekends.",
+                "Create a relaxing bedtime routine to signal your body it's time to sleep.",
+                "Avoid caffeine and large meals close to bedtime."
+            ],
+            'mental_health': [
+                "Taking care of your mental health is just as important as physical health.",
+                "Try practicing mindfulness or meditation for a few minutes each day.",
+                "Regular exercise can help improve mood and reduce stress.",
+                "Don't hesitate to reach out to friends, family, or a mental health professional.",
+                "Keeping a journal can help you process emotions and track mood patterns."
+            ],
+            'general': [
+                "That's a great health question. For specific medical advice, I recommend consulting with a healthcare professional.",
+                "I can provide general wellness information, but for personalized medical advice, please speak with your doctor.",
+                "Health is very individual. What works for one person might not work for another, so it's best to get professional guidance.",
+                "I'm here to provide general health information and tips. Is there a specific area of health you'd like to know more about?"
+            ],
+            'goodbye': [
+                "Take care of yourself! Remember, your health is your wealth.",
+                "Goodbye! Stay healthy and don't hesitate to ask if you have more health questions.",
+                "Have a healthy day! Remember to drink water and get some fresh air.",
+                "See you later! Keep up those healthy habits."
+            ]
+        }
         
-        for intent, patterns in self.intent_patterns.items():
+        self.intent_regex, self.intent_groups = self.compile_intent_patterns(self.intent_patterns)
+        # Ties between equally scored intents keep the declaration order above
+        self.intent_priority = {intent: i for i, intent in enumerate(self.intent_patterns)}
+        
+        # Streaming recognizers let us route urgent requests before the user stops speaking
+        self.voice.on_partial = self.handle_partial
+        
+        # Render every fixed reply up front so common answers start playing instantly
+        self.voice.prerender(self.static_phrases())
+    
+    @staticmethod
+    def compile_intent_patterns(intent_patterns: Dict[str, List[str]]):
+        """Compile all intent patterns into one word-bounded regex with a named group per pattern"""
+        alternatives = []
+        intent_groups = {}
+        for intent, patterns in intent_patterns.items():
             for pattern in patterns:
-                if re.search(pattern, text):
-                    return intent
+                group = f"p{len(alternatives)}"
+                intent_groups[group] = intent
+                alternatives.append((pattern, group))
+        
+        # Longest first so "good morning" wins over a shorter overlap at the same position
+        alternatives.sort(key=lambda item: len(item[0]), reverse=True)
+        # Stems of 4+ letters take derivations too ("sleepy", "stressful"); 3-letter words only
+        # inflect ("pills", "eats") so "quit" never becomes "quite"; very short words like "hi" stay exact
+        def suffix(pattern):
+            if len(pattern) >= 4:
+                return STEM_SUFFIX
+            return SHORT_WORD_SUFFIX if len(pattern) == 3 else ''
+        combined = "|".join(
+            f"(?P<{group}>(?:{pattern}){suffix(pattern)})"
+            for pattern, group in alternatives
+        )
+        return re.compile(rf"\b(?:{combined})\b"), intent_groups
+    
+    def score_intents(self, text: str) -> List[Tuple[str, int]]:
+        """Scan the utterance once and return (intent, match count) pairs, best first"""
+        scores = {}
+        text = text.lower()
+        for match in self.intent_regex.finditer(text):
+            intent = self.intent_groups[match.lastgroup]
+            # "a headache but nothing serious" must not trigger the emergency script; "911" always does
+            if intent == 'emergency' and match.group() != '911' and NEGATED_CONTEXT.search(text, 0, match.start()):
+                continue
+            scores[intent] = scores.get(intent, 0) + 1
         
-        return 'general'
+        return sorted(scores.items(), key=lambda item: (-item[1], self.intent_priority[item[0]]))
+    
+    def static_phrases(self) -> List[str]:
+        """Every reply whose text is known ahead of time"""
+        phrases = [phrase for replies in self.responses.values() for phrase in replies]
+        for category, tips in self.health_db.health_tips.items():
+            phrases.extend(f"Here's a health tip for you: {tip}" for tip in tips)
+        phrases.extend(f"Here's an exercise suggestion: {tip}" for tip in self.health_db.health_tips['exercise'])
+        for symptom, advice in self.health_db.symptom_advice.items():
+            phrases.append(f"For {symptom}, here's some general advice: {advice}")
+        phrases.append("Remember, this is general information only. Please consult a healthcare professional for proper medical advice.")
+        return phrases
+    
+    def notify_reminder(self, user_id: str, message: str):
+        """Default reminder delivery: say it on this assistant's channel"""
+        self.voice.speak(message)
+    
+    def ask(self, question: str, on_answer: Callable[[Optional[str]], None], timeout: float):
+        """Ask a follow-up without blocking; the next utterance, or None on timeout, goes to on_answer"""
+        self.followup = FollowUp(on_answer, timeout, time.time() + timeout)
+        self.voice.speak(question)
+    
+    def answer_followup(self, text: Optional[str]):
+        """Hand the user's reply (None if they never gave one) to the pending question"""
+        followup, self.followup = self.followup, None
+        if followup is not None:
+            followup.on_answer(text)
+    
+    def handle_partial(self, text: str) -> bool:
+        """Inspect a partial transcript; return True to end the utterance immediately"""
+        return any(intent == 'emergency' for intent, _ in self.score_intents(text))
+    
+    def classify_intent(self, text: str) -> str:
+        """Intent classification using the precompiled pattern automaton"""
+        scored = self.score_intents(text)
+        return scored[0][0] if scored else 'general'
     
     def handle_greeting(self, text: str):
         """Handle greeting messages"""
-        greetings = [
-            f"Hello! I'm your health assistant. How can I help you today?",
-            f"Hi there! I'm here to help with your health and wellness questions.",
-            f"Good to hear from you! What health topic would you like to discuss?",
-            f"Hello! I'm ready to assist you with health information and tips."
-        ]
-        
         import random
-        self.voice.speak(random.choice(greetings))
+        self.voice.speak(random.choice(self.responses['greeting']))
     
     def handle_health_tip(self, text: str):
         """Provide health tips"""
@@ -206,63 +1404,89 @@ class HealthAssistant:
     
     def handle_symptom(self, text: str):
         """Handle symptom inquiries"""
-        # Extract potential symptoms from text
-        found_symptoms = []
-        for symptom in self.health_db.symptom_advice.keys():
-            if symptom in text.lower():
-                found_symptoms.append(symptom)
-        
-        if found_symptoms:
-            symptom = found_symptoms[0]  # Handle first found symptom
-            advice = self.health_db.symptom_advice[symptom]
+        matches = self.health_db.symptom_index.match(text)
+        if not matches:
+            # Listen for more details, once
+            self.ask("I understand you're experiencing some symptoms. Can you be more specific about what you're feeling?",
+                     lambda response: self.advise_symptoms(
+                         self.health_db.symptom_index.match(response) if response and response != "unclear" else []
+                     ), timeout=10)
+            return
+        self.advise_symptoms(matches)
+    
+    def advise_symptoms(self, matches: List[SymptomMatch]):
+        """Record the matched symptoms and give advice for each"""
+        if matches:
+            for match in matches[:3]:
+                # Fuzzy matches may be mishearings; advise on them but only record what was clearly said
+                if match.score == 1.0:
+                    self.health_db.add_record("symptom", match.symptom, notes=match.phrase)
+                advice = self.health_db.symptom_advice[match.symptom]
+                self.voice.speak(f"For {match.symptom}, here's some general advice: {advice}")
             
-            self.voice.speak(f"For {symptom}, here's some general advice: {advice}")
             self.voice.speak("Remember, this is general information only. Please consult a healthcare professional for proper medical advice.")
         else:
-            self.voice.speak("I understand you're experiencing some symptoms. Can you be more specific about what you're feeling?")
-            
-            # Listen for more details
-            response = self.voice.listen_once(timeout=10)
-            if response and response != "unclear":
-                self.handle_symptom(response)
-            else:
-                self.voice.speak("I recommend speaking with a healthcare professional about your symptoms.")
+            self.voice.speak("I recommend speaking with a healthcare professional about your symptoms.")
     
     def handle_medication(self, text: str):
         """Handle medication-related queries"""
-        if 'reminder' in text or 'when' in text:
-            self.voice.speak("I can help you remember medications. What medication do you need to track?")
-            
-            response = self.voice.listen_once(timeout=10)
-            if response and response != "unclear":
-                # Simple medication logging
-                med_record = HealthRecord(
-                    date=datetime.now().strftime("%Y-%m-%d"),
-                    type="medication",
-                    value=response,
-                    notes="User inquiry"
-                )
-                self.health_db.records.append(med_record)
-                self.voice.speak(f"I've noted your medication: {response}. Remember to take it as prescribed by your doctor.")
+        if re.search(r'\b(took|taken)\b', text):
+            # Confirmed doses are the numerator of medication adherence
+            self.health_db.add_record(MEDICATION_TAKEN, text)
+            self.voice.speak("Thanks, I've recorded that you took your medication.")
+        elif 'reminder' in text or 'when' in text:
+            self.ask("I can help you remember medications. What medication do you need to track?",
+                     self.handle_medication_name, timeout=10)
         else:
             self.voice.speak("For medication questions, always consult your pharmacist or doctor. They can provide the most accurate information about dosages, interactions, and side effects.")
     
+    def handle_medication_name(self, response: Optional[str]):
+        """Follow-up: the medication to track"""
+        if response and response != "unclear":
+            # Simple medication logging
+            self.health_db.add_record("medication", response, notes="User inquiry")
+            self.ask(f"I've noted your medication: {response}. What time should I remind you? For example, 8 AM and 8 PM.",
+                     lambda answer: self.handle_reminder_times(response, answer), timeout=10)
+    
+    def handle_reminder_times(self, medication: str, response: Optional[str]):
+        """Follow-up: when to remind the user about a medication"""
+        times = self.parse_reminder_times(response or "")
+        if times:
+            self.reminders.add(self.health_db.user_id, medication, times)
+            spoken = " and ".join(datetime.strptime(t, "%H:%M").strftime("%I:%M %p").lstrip("0") for t in times)
+            self.voice.speak(f"I'll remind you to take {medication} every day at {spoken}.")
+        else:
+            self.voice.speak("Remember to take it as prescribed by your doctor.")
+    
+    @staticmethod
+    def parse_reminder_times(text: str) -> List[str]:
+        """Extract HH:MM times from phrases like '8 am and 8:30 pm', '20:00' or 'every morning'"""
+        text = text.lower()
+        times = []
+        for hour, minute, period in re.findall(r'\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s?m\b', text):
+            if 1 <= int(hour) <= 12 and int(minute or 0) < 60:
+                times.append(f"{int(hour) % 12 + (12 if period == 'p' else 0):02d}:{minute or '00'}")
+        for hour, minute in re.findall(r'\b(\d{1,2}):(\d{2})\b(?!\s*[ap]\.?\s?m\b)', text):
+            if int(hour) < 24 and int(minute) < 60:
+                times.append(f"{int(hour):02d}:{minute}")
+        
+        dayparts = {'morning': '08:00', 'noon': '12:00', 'afternoon': '14:00',
+                    'evening': '18:00', 'night': '21:00', 'bedtime': '21:00'}
+        for word, time_of_day in dayparts.items():
+            if re.search(rf'\b{word}\b', text):
+                times.append(time_of_day)
+        return sorted(set(times))
+    
     def handle_exercise(self, text: str):
         """Handle exercise and fitness queries"""
-        exercise_responses = [
-            "Regular exercise is great for your health! Start with 30 minutes of walking daily.",
-            "Try some simple stretches or yoga. Even 10 minutes can make a difference.",
-            "Exercise doesn't have to be intense. Dancing, gardening, or playing with pets all count!",
-            "Remember to warm up before exercise and cool down afterward to prevent injury."
-        ]
-        
         import random
-        self.voice.speak(random.choice(exercise_responses))
+        self.voice.speak(random.choice(self.responses['exercise']))
         
         # Ask if they want specific exercise suggestions
-        self.voice.speak("Would you like some specific exercise suggestions?")
-        response = self.voice.listen_once(timeout=8)
-        
+        self.ask("Would you like some specific exercise suggestions?", self.handle_exercise_answer, timeout=8)
+    
+    def handle_exercise_answer(self, response: Optional[str]):
+        """Follow-up: offer a concrete exercise if the user wants one"""
         if response and ('yes' in response or 'sure' in response):
             import random
             tip = random.choice(self.health_db.health_tips['exercise'])
@@ -270,31 +1494,16 @@ class HealthAssistant:
     
     def handle_nutrition(self, text: str):
         """Handle nutrition and diet questions"""
-        nutrition_advice = [
-            "A balanced diet includes fruits, vegetables, whole grains, lean proteins, and healthy fats.",
-            "Try to eat a rainbow of colorful fruits and vegetables each day.",
-            "Stay hydrated by drinking water throughout the day.",
-            "Limit processed foods and added sugars when possible.",
-            "Portion control is important - listen to your body's hunger cues."
-        ]
-        
         import random
-        self.voice.speak(random.choice(nutrition_advice))
+        self.voice.speak(random.choice(self.responses['nutrition']))
     
     def handle_sleep(self, text: str):
         """Handle sleep-related queries"""
         if 'insomnia' in text or 'trouble sleeping' in text:
             self.voice.speak("For better sleep, try keeping a regular bedtime routine, avoiding screens before bed, and keeping your bedroom cool and dark.")
         else:
-            sleep_tips = [
-                "Adults need 7-9 hours of sleep each night for optimal health.",
-                "Try to go to bed and wake up at the same time every day, even on weekends.",
-                "Create a relaxing bedtime routine to signal your body it's time to sleep.",
-                "Avoid caffeine and large meals close to bedtime."
-            ]
-            
             import random
-            self.voice.speak(random.choice(sleep_tips))
+            self.voice.speak(random.choice(self.responses['sleep']))
     
     def handle_mental_health(self, text: str):
         """Handle mental health inquiries"""
@@ -302,56 +1511,100 @@ class HealthAssistant:
             self.voice.speak("If you're having thoughts of self-harm, please reach out for immediate help. Contact 988 for the Suicide and Crisis Lifeline, or go to your nearest emergency room.")
             return
         
-        mental_health_advice = [
-            "Taking care of your mental health is just as important as physical health.",
-            "Try practicing mindfulness or meditation for a few minutes each day.",
-            "Regular exercise can help improve mood and reduce stress.",
-            "Don't hesitate to reach out to friends, family, or a mental health professional.",
-            "Keeping a journal can help you process emotions and track mood patterns."
-        ]
-        
         import random
-        self.voice.speak(random.choice(mental_health_advice))
+        self.voice.speak(random.choice(self.responses['mental_health']))
         
         if 'stress' in text:
             self.voice.speak("For immediate stress relief, try taking slow, deep breaths or doing a quick 5-minute meditation.")
     
+    @staticmethod
+    def parse_time_range(text: str) -> Tuple[float, float, str]:
+        """Map phrases like "last night" or "this week" to (start, end, spoken label)"""
+        now = datetime.now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if 'last night' in text:
+            start, end, label = midnight - timedelta(hours=4), midnight + timedelta(hours=8), "last night"
+        elif 'yesterday' in text:
+            start, end, label = midnight - timedelta(days=1), midnight, "yesterday"
+        elif 'today' in text:
+            start, end, label = midnight, now, "today"
+        elif 'month' in text:
+            start, end, label = now - timedelta(days=30), now, "over the past month"
+        elif 'week' in text:
+            start, end, label = now - timedelta(days=7), now, "over the past week"
+        else:
+            start, end, label = now - timedelta(hours=24), now, "in the last 24 hours"
+        return start.timestamp(), min(end, now).timestamp(), label
+    
+    def handle_history(self, text: str):
+        """Summarise falls, near misses, symptoms and medication adherence from the shared timeline"""
+        timeline = self.health_db.timeline
+        resident = self.health_db.user_id
+        
+        if 'per week' in text or 'each week' in text or 'weekly' in text:
+            today = datetime.now().date()
+            weeks = timeline.weekly_counts(resident, FALL_CONFIRMED, (today - timedelta(weeks=4)).isoformat(), today.isoformat())
+            if weeks:
+                summary = ", ".join(f"week {key.split('-W')[1].lstrip('0')}: {count}" for key, count in sorted(weeks.items()))
+                self.voice.speak(f"Falls per week over the last month. {summary}.")
+            else:
+                self.voice.speak("There have been no falls in the last month.")
+            return
+        
+        start, end, label = self.parse_time_range(text)
+        falls = timeline.count(resident, FALL_CONFIRMED, start, end)
+        # Every confirmed fall passed through POTENTIAL_FALL first; the rest recovered
+        near_misses = max(0, timeline.count(resident, POTENTIAL_FALL, start, end) - falls)
+        parts = [f"{label[0].upper() + label[1:]}, there {'was' if falls == 1 else 'were'} {falls} "
+                 f"confirmed fall{'' if falls == 1 else 's'} and {near_misses} near "
+                 f"miss{'' if near_misses == 1 else 'es'}."]
+        
+        symptoms = sorted({event.value for event in timeline.events(resident, start, end, ["symptom"])})
+        if symptoms:
+            parts.append(f"Symptoms mentioned: {', '.join(symptoms)}.")
+        
+        adherence = timeline.medication_adherence(resident, start, end)
+        if adherence is not None:
+            parts.append(f"{round(adherence * 100)} percent of reminded medication doses were confirmed as taken.")
+        self.voice.speak(" ".join(parts))
+    
     def handle_emergency(self, text: str):
         """Handle emergency situations"""
         self.voice.speak("For medical emergencies, call 911 immediately. For poison emergencies, call 1-800-222-1222. I'm not a substitute for emergency medical care.")
     
     def handle_general(self, text: str):
         """Handle general health questions"""
-        general_responses = [
-            "That's a great health question. For specific medical advice, I recommend consulting with a healthcare professional.",
-            "I can provide general wellness information, but for personalized medical advice, please speak with your doctor.",
-            "Health is very individual. What works for one person might not work for another, so it's best to get professional guidance.",
-            "I'm here to provide general health information and tips. Is there a specific area of health you'd like to know more about?"
-        ]
-        
         import random
-        self.voice.speak(random.choice(general_responses))
+        self.voice.speak(random.choice(self.responses['general']))
     
     def handle_goodbye(self, text: str):
         """Handle goodbye messages"""
-        goodbye_messages = [
-            "Take care of yourself! Remember, your health is your wealth.",
-            "Goodbye! Stay healthy and don't hesitate to ask if you have more health questions.",
-            "Have a healthy day! Remember to drink water and get some fresh air.",
-            "See you later! Keep up those healthy habits."
-        ]
-        
         import random
-        self.voice.speak(random.choice(goodbye_messages))
+        self.voice.speak(random.choice(self.responses['goodbye']))
         self.conversation_active = False
     
+    def route(self, text: str) -> str:
+        """Pick the intent whose handler should answer this utterance"""
+        intents = [intent for intent, _ in self.score_intents(text)]
+        # An emergency mentioned anywhere in a multi-intent utterance takes precedence
+        if 'emergency' in intents:
+            return 'emergency'
+        return intents[0] if intents else 'general'
+    
     def process_command(self, text: str):
         """Process user commands and respond appropriately"""
+        if self.followup is not None:
+            if time.time() < self.followup.deadline:
+                self.answer_followup(text)
+                return
+            # Answered too late: close the question as unanswered, then treat this as a new request
+            self.answer_followup(None)
+        
         if not text or text == "unclear":
             self.voice.speak("I didn't catch that clearly. Could you please repeat?")
             return
         
-        intent = self.classify_intent(text)
+        intent = self.route(text)
         
         # Route to appropriate handler
         handlers = {
@@ -363,6 +1616,7 @@ class HealthAssistant:
             'nutrition': self.handle_nutrition,
             'sleep': self.handle_sleep,
             'mental_health': self.handle_mental_health,
+            'history': self.handle_history,
             'emergency': self.handle_emergency,
             'goodbye': self.handle_goodbye,
             'general': self.handle_general
@@ -373,15 +1627,18 @@ class HealthAssistant:
     
     def interactive_mode(self):
         """Interactive conversation mode"""
+        self.voice.start_stream()
         self.voice.speak("Hello! I'm your health assistant. I can help with health tips, symptom information, and wellness advice. What would you like to know?")
         
         while self.conversation_active:
             try:
-                # Listen for user input
-                user_input = self.voice.listen_once(timeout=15)
+                # Listen for user input, or for the answer to a pending question
+                user_input = self.voice.listen_once(timeout=self.followup.timeout if self.followup else 15)
                 
                 if user_input:
                     self.process_command(user_input)
+                elif self.followup:
+                    self.answer_followup(None)
                 else:
                     # Timeout - offer help
                     self.voice.speak("I'm still here if you need any health information. Just say something!")
@@ -392,6 +1649,10 @@ class HealthAssistant:
             except Exception as e:
                 logger.error(f"Error in interactive mode: {e}")
                 self.voice.speak("Sorry, I encountered an issue. Let's try again.")
+        
+        # Let the goodbye finish before releasing the microphone
+        self.voice.wait_until_done()
+        self.voice.stop_stream()
     
     def run(self):
         """Main application loop"""
@@ -401,6 +1662,7 @@ class HealthAssistant:
             print("📋 Try saying: 'health tip', 'I have a headache', 'exercise advice'")
             print("🚪 Say 'goodbye' or press Ctrl+C to exit\n")
             
+            self.reminders.start()
             self.interactive_mode()
             
         except KeyboardInterrupt:
@@ -408,11 +1670,269 @@ class HealthAssistant:
         except Exception as e:
             logger.error(f"Application error: {e}")
             print("❌ Sorry, there was an error. Please restart the application.")
+        finally:
+            # Write out any batched health records
+            self.reminders.stop()
+            self.health_db.close()
+
+class SpeechRenderer:
+    """Renders phrases to WAV bytes for remote sessions; only ever used from one worker thread"""
+    
+    def __init__(self):
+        self.phrase_cache = PhraseCache()
+        self.tts_engine = None
+        self.voice_settings = None
+        # Fixed replies shared by every session; everything else is rendered to a temp file and deleted
+        self.static_phrases = frozenset()
+    
+    def render(self, text: str) -> bytes:
+        if self.tts_engine is None:
+            self.tts_engine = pyttsx3.init()
+            self.tts_engine.setProperty('rate', 175)
+            self.tts_engine.setProperty('volume', 0.9)
+            self.voice_settings = (
+                self.tts_engine.getProperty('voice'),
+                self.tts_engine.getProperty('rate'),
+                self.tts_engine.getProperty('volume')
+            )
+        
+        if text not in self.static_phrases:
+            path = render_to_temp_file(self._render, text)
+            try:
+                with open(path, 'rb') as f:
+                    return f.read()
+            finally:
+                os.remove(path)
+        
+        path = self.phrase_cache.get(text, self.voice_settings)
+        if path is None:
+            path = self.phrase_cache.path_for(text, self.voice_settings)
+            self._render(text, path)
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    def _render(self, text: str, path: str):
+        self.tts_engine.save_to_file(text, path)
+        self.tts_engine.runAndWait()
+
+def verify_jwt(token: str, secret: str) -> Optional[dict]:
+    """Claims of a valid, unexpired HS256 token signed by the Node backend, otherwise None"""
+    def decode(part: str) -> bytes:
+        return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+    
+    try:
+        header, payload, signature = token.split(".")
+        if json.loads(decode(header)).get("alg") != "HS256":
+            return None
+        expected = hmac.new(secret.encode("utf-8"), f"{header}.{payload}".encode("ascii"), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, decode(signature)):
+            return None
+        claims = json.loads(decode(payload))
+        if "exp" in claims and time.time() >= claims["exp"]:
+            return None
+        return claims
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+class AssistantServer:
+    """Serves many concurrent assistant sessions over WebSocket from one process
+    
+    Sessions authenticate with the JWT issued by the Node backend's /api/auth/login;
+    the token's user id selects whose records, timeline and reminders the session sees.
+    
+    Protocol (JSON messages):
+        client -> {"type": "start", "token": "<JWT>", "audio": false}
+        client -> {"type": "text", "text": "..."}
+        client -> {"type": "audio", "sample_rate": 16000, "data": "<base64 16-bit mono PCM>"}
+        server -> {"type": "speech", "text": "...", "audio": "<base64 WAV, audio sessions only>"}
+        server -> {"type": "end"}
+        server -> {"type": "error", "error": "unauthorized"}
+    """
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, asr_workers: int = 4, db_workers: int = 8,
+                 store: Optional[SQLiteHealthStore] = None, jwt_secret: Optional[str] = JWT_SECRET):
+        self.host = host
+        self.port = port
+        self.jwt_secret = jwt_secret
+        self.store = store or SQLiteHealthStore()
+        self.timeline = TimelineStore()
+        # Turns never wait for user input, but they do SQLite I/O, and timeline.db can be write-locked
+        # by a camera process for seconds; that wait must not stall the event loop and every other session
+        self.db_pool = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix="db")
+        self.asr_pool = ThreadPoolExecutor(max_workers=asr_workers, thread_name_prefix="asr")
+        # The TTS engine is not thread-safe, so synthesis is serialised on a single thread
+        self.tts_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        self.recognizer_backend = None
+        self.renderer = SpeechRenderer()
+        self.sessions = 0
+        # One timer thread serves every user's medication reminders
+        self.channels = {}
+        self.reminders = ReminderScheduler(self.store, notifier=self._deliver_reminder, timeline=self.timeline)
+    
+    async def handle_connection(self, websocket, path=None):
+        loop = asyncio.get_running_loop()
+        outbox = asyncio.Queue()
+        channel = TextChannel(lambda text: loop.call_soon_threadsafe(outbox.put_nowait, text))
+        
+        try:
+            start = json.loads(await websocket.recv())
+        except Exception:
+            return
+        claims = verify_jwt(str(start.get("token", "")), self.jwt_secret) if isinstance(start, dict) else None
+        if not claims or "id" not in claims:
+            try:
+                await websocket.send(json.dumps({"type": "error", "error": "unauthorized"}))
+                await websocket.close()
+            except Exception:
+                pass
+            return
+        user_id = str(claims["id"])
+        wants_audio = bool(start.get("audio", False))
+        health_db = HealthDatabase(user_id, store=self.store, timeline=self.timeline)
+        assistant = HealthAssistant(channel=channel, health_db=health_db, reminders=self.reminders)
+        if not self.renderer.static_phrases:
+            # Fixed replies are the same for every session; only these may be cached on disk
+            self.renderer.static_phrases = frozenset(assistant.static_phrases())
+        self.channels[user_id] = channel
+        
+        self.sessions += 1
+        logger.info(f"Session started for {user_id} ({self.sessions} active)")
+        sender = asyncio.create_task(self._send_loop(websocket, outbox, wants_audio))
+        
+        turn_lock = asyncio.Lock()
+        
+        def expire_followup(followup: FollowUp):
+            # Still unanswered when its time ran out: let the handler say its no-answer reply
+            if assistant.followup is followup:
+                assistant.answer_followup(None)
+        
+        async def run_turn(turn: Callable[[], None]):
+            # A session's turns run one at a time, on the database pool rather than the event loop
+            async with turn_lock:
+                await loop.run_in_executor(self.db_pool, self._run_turn, assistant, channel, turn)
+            followup = assistant.followup
+            if followup is not None:
+                loop.call_later(followup.timeout, lambda: asyncio.ensure_future(run_turn(lambda: expire_followup(followup))))
+        
+        try:
+            async for raw in websocket:
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    continue
+                # Well-formed JSON that is not an object ("junk", [1, 2]) is ignored, not fatal
+                if not isinstance(message, dict):
+                    continue
+                text = await self._decode(message)
+                if text is None:
+                    continue
+                await run_turn(lambda: assistant.process_command(text))
+                if not assistant.conversation_active:
+                    # After a goodbye, flush what was said and let the sender close the socket
+                    break
+        except Exception as e:
+            logger.error(f"Session error for {user_id}: {e}")
+        finally:
+            await outbox.put(None)
+            await sender
+            if self.channels.get(user_id) is channel:
+                del self.channels[user_id]
+            self.sessions -= 1
+            logger.info(f"Session ended for {user_id} ({self.sessions} active)")
+    
+    def _deliver_reminder(self, user_id: str, message: str):
+        """Timer thread: speak the reminder in the user's live session, if any"""
+        channel = self.channels.get(user_id)
+        if channel is not None:
+            channel.speak(message)
+        else:
+            logger.info(f"Reminder for {user_id} (no active session): {message}")
+    
+    @staticmethod
+    def _run_turn(assistant: 'HealthAssistant', channel: TextChannel, turn: Callable[[], None]):
+        """Worker thread: run one turn; speech goes back to the event loop through the channel"""
+        try:
+            turn()
+        except Exception as e:
+            logger.error(f"Handler error: {e}")
+            assistant.followup = None
+            channel.speak("Sorry, I encountered an issue. Let's try again.")
+    
+    async def _decode(self, message: dict) -> Optional[str]:
+        """Turn a client message into an utterance, running recognition off the event loop"""
+        if message.get("type") == "text":
+            return str(message.get("text", "")).lower() or "unclear"
+        if message.get("type") == "audio":
+            audio = sr.AudioData(base64.b64decode(message["data"]), int(message.get("sample_rate", 16000)), 2)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.asr_pool, self._recognize, audio)
+        return None
+    
+    def _recognize(self, audio: sr.AudioData) -> Optional[str]:
+        if self.recognizer_backend is None:
+            self.recognizer_backend = create_recognizer_backend(sr.Recognizer())
+        try:
+            return self.recognizer_backend.recognize(audio).lower()
+        except sr.UnknownValueError:
+            return "unclear"
+        except sr.RequestError as e:
+            logger.error(f"Recognition error: {e}")
+            return None
+    
+    async def _send_loop(self, websocket, outbox: asyncio.Queue, wants_audio: bool):
+        loop = asyncio.get_running_loop()
+        while True:
+            text = await outbox.get()
+            if text is None:
+                break
+            message = {"type": "speech", "text": text}
+            if wants_audio:
+                wav = await loop.run_in_executor(self.tts_pool, self.renderer.render, text)
+                message["audio"] = base64.b64encode(wav).decode("ascii")
+            try:
+                await websocket.send(json.dumps(message))
+            except Exception:
+                return
+        try:
+            await websocket.send(json.dumps({"type": "end"}))
+            await websocket.close()
+        except Exception:
+            pass
+    
+    async def serve_forever(self):
+        if websockets is None:
+            raise RuntimeError("Server mode requires the 'websockets' package")
+        if not self.jwt_secret:
+            raise RuntimeError("Server mode requires JWT_SECRET, the secret the Node backend signs tokens with")
+        async with websockets.serve(self.handle_connection, self.host, self.port):
+            logger.info(f"Health assistant server listening on ws://{self.host}:{self.port}")
+            await asyncio.Future()
+    
+    def run(self):
+        try:
+            self.reminders.start()
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.reminders.stop()
+            self.store.close()
+            self.timeline.close()
 
 def main():
     """Entry point"""
+    parser = argparse.ArgumentParser(description="Health AI Voice Assistant")
+    parser.add_argument("--serve", action="store_true", help="serve concurrent sessions over WebSocket")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on; clients still need a backend JWT")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    
+    if args.serve:
+        AssistantServer(host=args.host, port=args.port).run()
+        return
+    
     assistant = HealthAssistant()
     assistant.run()
 
-if _name_== "_main_":
+if __name__ == "__main__":
     main()
\ No newline at end of file
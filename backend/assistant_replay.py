@@ -0,0 +1,118 @@
+"""Headless replay harness and throughput benchmark for the health assistant.
+
+Feeds recorded transcripts through HealthAssistant with a recording channel
+instead of a microphone and speaker, checks each utterance is routed to the
+expected intent, and reports utterances per second and per-handler latency.
+
+    python assistant_replay.py --transcripts replay_transcripts.jsonl --repeat 200
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from Medical_assistant import (
+    ConversationChannel, HealthAssistant, HealthDatabase, ReminderScheduler, SQLiteHealthStore
+)
+from timeline_store import TimelineStore
+
+class RecordingChannel(ConversationChannel):
+    """Null audio channel: records what the assistant says"""
+
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, text: str):
+        self.spoken.append(text)
+
+    def listen_once(self, timeout: int = 5) -> Optional[str]:
+        # Follow-up answers are fed to process_command by replay()
+        return None
+
+def load_transcripts(path: str) -> List[Dict]:
+    """One JSON object per line: {"text": ..., "expect": intent, "followups": [...], "records": [symptom, ...]}"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def replay(transcripts: List[Dict], repeat: int = 1) -> Dict:
+    channel = RecordingChannel()
+    store = SQLiteHealthStore(":memory:")
+    timeline = TimelineStore(":memory:")
+    # The scheduler is never started, so reminders are stored but not fired
+    assistant = HealthAssistant(channel=channel, health_db=HealthDatabase("replay", store=store, timeline=timeline),
+                                reminders=ReminderScheduler(store, timeline=timeline))
+
+    failures = []
+    latencies = defaultdict(list)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for case in transcripts:
+            text = case["text"].lower()
+            intent = assistant.route(text)
+            if case.get("expect") and intent != case["expect"]:
+                failures.append((case["text"], case["expect"], intent))
+
+            recorded = store.count("replay", "symptom")
+            assistant.conversation_active = True
+            t0 = time.perf_counter()
+            assistant.process_command(text)
+            # Scripted answers to the handler's follow-up questions arrive as the next utterances
+            for followup in case.get("followups", []):
+                if assistant.followup is None:
+                    break
+                assistant.process_command(followup.lower())
+            if assistant.followup is not None:
+                assistant.answer_followup(None)
+            latencies[intent].append(time.perf_counter() - t0)
+            # Denied symptoms ("no fever") must not end up in the resident's history
+            if "records" in case:
+                symptoms = sorted(record.value for record in store.query("replay", "symptom")[recorded:])
+                if symptoms != sorted(case["records"]):
+                    failures.append((case["text"], f"records {sorted(case['records'])}", f"records {symptoms}"))
+    elapsed = time.perf_counter() - started
+    store.close()
+    timeline.close()
+
+    return {
+        "utterances": len(transcripts) * repeat,
+        "elapsed": elapsed,
+        "failures": failures,
+        "latencies": latencies,
+        "spoken": len(channel.spoken)
+    }
+
+def print_report(result: Dict, repeat: int):
+    print(f"Replayed {result['utterances']} utterances in {result['elapsed']:.3f}s "
+          f"({result['utterances'] / result['elapsed']:.0f} utterances/s, {result['spoken']} replies)")
+    print(f"{'handler':<15}{'calls':>8}{'mean ms':>10}{'p95 ms':>10}")
+    for intent, samples in sorted(result["latencies"].items()):
+        ordered = sorted(samples)
+        mean = sum(ordered) / len(ordered) * 1000
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+        print(f"{intent:<15}{len(ordered):>8}{mean:>10.3f}{p95:>10.3f}")
+
+    # Every repetition fails the same way; report each misroute once
+    failures = result["failures"][:len(result["failures"]) // repeat]
+    for text, expected, actual in failures:
+        print(f"[MISROUTE] {text!r}: expected {expected}, got {actual}")
+    print("OK" if not failures else f"{len(failures)} misrouted utterance(s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay transcripts through the health assistant")
+    parser.add_argument("--transcripts", default="replay_transcripts.jsonl")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the transcript set this many times")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the handlers' random reply choice")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    logging.getLogger("Medical_assistant").setLevel(logging.WARNING)
+    result = replay(load_transcripts(args.transcripts), args.repeat)
+    print_report(result, args.repeat)
+    sys.exit(1 if result["failures"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ const http = require('http');
 const { Server: IOServer } = require('socket.io');
 
 const app = express();
+// Fall-event batches carry pose keypoints (~5 KB per event) and exceed the default 100 KB limit.
+// Parsed first so the global parser below skips these requests.
+app.use('/api/fall-events', express.json({ limit: '1mb' }));
 app.use(express.json());
 
 // =====================================
@@ -323,6 +326,37 @@ app.put('/api/appointments/:id/status', async (req, res) => {
   }
 });
 
+// -------- FALL DETECTION ROUTES --------
+// Batches posted by Fall-detection-model/event_publisher.py.
+// Each event carries a per-publisher `seq`, so replayed batches arrive in order.
+// `seq` restarts with each publisher process; (`run_id`, `seq`) identifies an event, so retried ones are dropped.
+const cameraStatus = {};
+const seenFallEvents = new Set();
+const SEEN_FALL_EVENTS_LIMIT = 10000;
+
+app.post('/api/fall-events', (req, res) => {
+  const { events } = req.body;
+  if (!Array.isArray(events)) return res.status(400).json({ error: 'events must be an array' });
+  for (const event of events) {
+    if (event.type === 'heartbeat') {
+      cameraStatus[event.camera_id] = { status: event.payload?.status, lastSeen: new Date().toISOString() };
+      io.emit('camera-status', { cameraId: event.camera_id, ...cameraStatus[event.camera_id] });
+    } else if (event.type === 'fall_event') {
+      const key = `${event.run_id}:${event.seq}`;
+      if (seenFallEvents.has(key)) continue;
+      seenFallEvents.add(key);
+      // Sets iterate in insertion order, so this forgets the oldest key
+      if (seenFallEvents.size > SEEN_FALL_EVENTS_LIMIT) seenFallEvents.delete(seenFallEvents.values().next().value);
+      io.emit('fall-event', { cameraId: event.camera_id, seq: event.seq, ...event.payload });
+    }
+  }
+  res.json({ accepted: events.length });
+});
+
+app.get('/api/fall-events/cameras', (req, res) => {
+  res.json(cameraStatus);
+});
+
 // -------- HEALTH CHECK --------
 app.get('/api/health', (req, res) => {
   res.json({ status: 'healthy', timestamp: new Date().toISOString() });
@@ -0,0 +1,155 @@
+"""Shared per-resident timeline of fall-detection events and health records.
+
+Both the fall detector (Fall-detection-model) and the health assistant append
+to the same SQLite file. Events are never updated or deleted. They are keyed
+by (resident_id, day, ts), so a time-range query only touches that resident's
+days in range. A daily rollup table, maintained on every append, answers
+aggregations like "falls per week" without reading the raw events.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+TIMELINE_DB_PATH = os.environ.get("TIMELINE_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "timeline.db"))
+
+# Event kinds written by the fall detector
+FALL_CONFIRMED = "fall_confirmed"
+POTENTIAL_FALL = "potential_fall"
+# Event kinds written by the assistant's reminder scheduler and medication handler
+MEDICATION_DUE = "medication_due"
+MEDICATION_TAKEN = "medication_taken"
+
+@dataclass(slots=True)
+class TimelineEvent:
+    """One entry in a resident's timeline"""
+    resident_id: str
+    ts: float
+    kind: str
+    value: str = ""
+    data: Optional[dict] = None
+
+class TimelineStore:
+    """Append-only time-series store partitioned by resident and day"""
+
+    def __init__(self, path: str = TIMELINE_DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        # Several processes (cameras, assistant) share one file, so wait out their write locks
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS timeline_events (
+                resident_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL DEFAULT '',
+                data TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_timeline_partition ON timeline_events (resident_id, day, ts);
+            CREATE TABLE IF NOT EXISTS timeline_daily_counts (
+                resident_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (resident_id, day, kind)
+            ) WITHOUT ROWID;
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def day_of(ts: float) -> str:
+        return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+    def append(self, resident_id: str, kind: str, value: str = "", data: Optional[dict] = None,
+               ts: Optional[float] = None) -> TimelineEvent:
+        """Add an event and bump the resident's daily count for its kind"""
+        event = TimelineEvent(resident_id, ts if ts is not None else time.time(), kind, value, data)
+        day = self.day_of(event.ts)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO timeline_events (resident_id, day, ts, kind, value, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (resident_id, day, event.ts, kind, value, json.dumps(data) if data is not None else None)
+            )
+            self.conn.execute(
+                "INSERT INTO timeline_daily_counts (resident_id, day, kind, count) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT (resident_id, day, kind) DO UPDATE SET count = count + 1",
+                (resident_id, day, kind)
+            )
+        return event
+
+    def events(self, resident_id: str, start: float, end: float,
+               kinds: Optional[List[str]] = None) -> List[TimelineEvent]:
+        """Events with start <= ts < end, oldest first"""
+        sql = ("SELECT resident_id, ts, kind, value, data FROM timeline_events "
+               "WHERE resident_id = ? AND day BETWEEN ? AND ? AND ts >= ? AND ts < ?")
+        params = [resident_id, self.day_of(start), self.day_of(end), start, end]
+        if kinds:
+            sql += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        with self.lock:
+            rows = self.conn.execute(sql + " ORDER BY ts", params).fetchall()
+        return [TimelineEvent(r, ts, kind, value, json.loads(data) if data else None)
+                for r, ts, kind, value, data in rows]
+
+    def count(self, resident_id: str, kind: str, start: float, end: float) -> int:
+        """Exact count over a time range: whole days come from the rollup, partial days from the index"""
+        first_day, last_day = self.day_of(start), self.day_of(end)
+        whole_start = (date.fromisoformat(first_day) + timedelta(days=1)).isoformat()
+        whole_end = (date.fromisoformat(last_day) - timedelta(days=1)).isoformat()
+        with self.lock:
+            total = 0
+            if whole_start <= whole_end:
+                total += self.conn.execute(
+                    "SELECT COALESCE(SUM(count), 0) FROM timeline_daily_counts "
+                    "WHERE resident_id = ? AND kind = ? AND day BETWEEN ? AND ?",
+                    (resident_id, kind, whole_start, whole_end)
+                ).fetchone()[0]
+            for day in {first_day, last_day}:
+                total += self.conn.execute(
+                    "SELECT COUNT(*) FROM timeline_events "
+                    "WHERE resident_id = ? AND day = ? AND kind = ? AND ts >= ? AND ts < ?",
+                    (resident_id, day, kind, start, end)
+                ).fetchone()[0]
+        return total
+
+    def daily_counts(self, resident_id: str, start_day: str, end_day: str,
+                     kinds: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """{day: {kind: count}} for an inclusive range of "YYYY-MM-DD" days"""
+        sql = ("SELECT day, kind, count FROM timeline_daily_counts "
+               "WHERE resident_id = ? AND day BETWEEN ? AND ?")
+        params = [resident_id, start_day, end_day]
+        if kinds:
+            sql += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        result = {}
+        with self.lock:
+            for day, kind, count in self.conn.execute(sql, params):
+                result.setdefault(day, {})[kind] = count
+        return result
+
+    def weekly_counts(self, resident_id: str, kind: str, start_day: str, end_day: str) -> Dict[str, int]:
+        """{ISO week "YYYY-Www": count} of one kind, from the daily rollup"""
+        weeks = {}
+        for day, counts in self.daily_counts(resident_id, start_day, end_day, [kind]).items():
+            year, week, _ = date.fromisoformat(day).isocalendar()
+            key = f"{year}-W{week:02d}"
+            weeks[key] = weeks.get(key, 0) + counts.get(kind, 0)
+        return weeks
+
+    def medication_adherence(self, resident_id: str, start: float, end: float) -> Optional[float]:
+        """Fraction of reminded doses confirmed as taken, or None if no doses were due"""
+        due = self.count(resident_id, MEDICATION_DUE, start, end)
+        if due == 0:
+            return None
+        return min(1.0, self.count(resident_id, MEDICATION_TAKEN, start, end) / due)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()